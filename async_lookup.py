@@ -0,0 +1,128 @@
+"""
+Async Lookup - asyncio counterparts of the citizen, organization, wiki and Galactapedia lookups
+
+All coroutines share one event loop and a per-host semaphore, so hundreds of
+lookups can be fanned out at once while only a bounded number of requests are
+in flight against each upstream host.
+
+Example:
+    import asyncio
+    import async_lookup
+
+    async def main():
+        handles = ["KenzoKai", "Cobalt"]
+        return await asyncio.gather(*(async_lookup.get_citizen_profile_async(h) for h in handles))
+
+    profiles = async_lookup.run(main())
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import citizen_lookup
+import org_lookup
+import simple_example
+import galactapedia_lookup
+
+RSI_HOST = "robertsspaceindustries.com"
+WIKI_HOST = "starcitizen.tools"
+
+# Maximum number of requests in flight per upstream host
+HOST_LIMITS = {
+    RSI_HOST: int(os.environ.get("SCTOOLS_RSI_CONCURRENCY", "8")),
+    WIKI_HOST: int(os.environ.get("SCTOOLS_WIKI_CONCURRENCY", "8"))
+}
+
+# The blocking fetchers run on this pool; it is sized so the semaphores, not the pool, are the limit
+_executor = ThreadPoolExecutor(max_workers=sum(HOST_LIMITS.values()), thread_name_prefix="async_lookup")
+
+_loop = None
+_loop_lock = threading.Lock()
+# Event loop -> {host: semaphore}; dropped along with the loop
+_semaphores = weakref.WeakKeyDictionary()
+
+def get_loop():
+    """Return the shared event loop, starting it in a background thread on first use"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="async_lookup_loop", daemon=True)
+            thread.start()
+        return _loop
+
+def run(coro):
+    """Run a coroutine on the shared event loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+def _host_semaphore(host):
+    """Return the semaphore limiting requests to `host` on the running loop"""
+    loop = asyncio.get_running_loop()
+    with _loop_lock:
+        semaphores = _semaphores.setdefault(loop, {})
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(HOST_LIMITS[host])
+        return semaphores[host]
+
+async def _call(host, func, *args, **kwargs):
+    """Run a blocking lookup in the thread pool while holding a slot for its host"""
+    async with _host_semaphore(host):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+async def get_citizen_profile_async(handle):
+    """Async version of citizen_lookup.get_citizen_profile"""
+    return await _call(RSI_HOST, citizen_lookup.get_citizen_profile, handle)
+
+async def get_organization_profile_async(sid):
+    """Async version of org_lookup.get_organization_profile"""
+    return await _call(RSI_HOST, org_lookup.get_organization_profile, sid)
+
+async def get_organization_members_async(sid):
+    """Async version of org_lookup.get_organization_members"""
+    # One page at a time, so the whole list is fetched within the single RSI slot held here
+    return await _call(RSI_HOST, org_lookup.get_organization_members, sid, workers=1)
+
+async def search_wiki_async(search_term, limit=5):
+    """Async version of simple_example.search_wiki"""
+    return await _call(WIKI_HOST, simple_example.search_wiki, search_term, limit)
+
+async def get_wiki_page_async(page_title):
+    """Async version of simple_example.get_wiki_page"""
+    return await _call(WIKI_HOST, simple_example.get_wiki_page, page_title)
+
+async def get_wiki_pages_async(titles, batch_size=simple_example.TITLES_PER_REQUEST):
+    """Async version of simple_example.get_wiki_pages"""
+    return await _call(WIKI_HOST, simple_example.get_wiki_pages, titles, batch_size)
+
+class AsyncGalactapediaClient:
+    """Async wrapper around GalactapediaClient sharing its caches (the handlers' shared client by default)"""
+
+    def __init__(self, client=None):
+        self.client = client or galactapedia_lookup.get_shared_client()
+
+    async def search_articles(self, query):
+        """Async version of GalactapediaClient.search_articles"""
+        # Category listings are fetched one at a time, within the single RSI slot held here
+        return await _call(RSI_HOST, self.client.search_articles, query, workers=1)
+
+    async def get_article(self, article_id):
+        """Async version of GalactapediaClient.get_article"""
+        return await _call(RSI_HOST, self.client.get_article, article_id, workers=1)
+
+    async def get_category(self, category_name):
+        """Async version of GalactapediaClient.get_category"""
+        return await _call(RSI_HOST, self.client.get_category, category_name)
+
+    async def get_categories(self):
+        """Async version of GalactapediaClient.get_categories"""
+        return await _call(RSI_HOST, self.client.get_categories)
+
+    async def get_common_ship_info(self, query):
+        """Async version of GalactapediaClient.get_common_ship_info"""
+        # Served from the local ship table, so there is no host slot to wait for
+        return self.client.get_common_ship_info(query)
@@ -0,0 +1,86 @@
+"""
+Fuzzy Match Benchmark - Compares per-query fuzzy scans against the precomputed deletion dictionary
+
+Builds synthetic corpora of ship-like names and times misspelled lookups with
+the old approach (generate swap/deletion variants and scan every name on each
+query) and with fuzzy_match.FuzzyMatcher, whose deletion dictionary is built once.
+
+Usage: python benchmarks/bench_fuzzy.py [queries]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzy_match import FuzzyMatcher
+
+CORPUS_SIZES = (100, 1000, 10000, 50000)
+SYLLABLES = ["ca", "rr", "ack", "con", "stel", "la", "tion", "phoe", "nix", "sa", "bre",
+             "id", "ris", "cut", "lass", "tau", "rus", "an", "dro", "me", "da", "aq", "ui"]
+
+def legacy_fuzzy_match(query, target):
+    """The per-pair matcher previously used by get_common_ship_info"""
+    if query == target:
+        return True
+    if query in target or target in query:
+        return True
+    if len(query) > 4 and len(target) > 4:
+        for i in range(len(query) - 1):
+            swapped = query[:i] + query[i+1] + query[i] + query[i+2:]
+            if swapped == target or swapped in target:
+                return True
+        if abs(len(query) - len(target)) <= 2:
+            for i in range(len(query)):
+                if query[:i] + query[i+1:] == target:
+                    return True
+            for i in range(len(target)):
+                if target[:i] + target[i+1:] == query:
+                    return True
+    return False
+
+def make_corpus(size, rng):
+    """Generate `size` distinct pseudo ship names"""
+    names = set()
+    while len(names) < size:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 5))))
+    return sorted(names)
+
+def misspell(name, rng):
+    """Swap two adjacent characters or drop one"""
+    i = rng.randrange(len(name) - 1)
+    if rng.random() < 0.5:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + name[i + 1:]
+
+def main():
+    query_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = random.Random(42)
+
+    print(f"{'names':>8}{'build ms':>10}{'scan ms/query':>16}{'index ms/query':>16}{'speedup':>10}")
+    for size in CORPUS_SIZES:
+        corpus = make_corpus(size, rng)
+        queries = [misspell(rng.choice(corpus), rng) for _ in range(query_count)]
+
+        start = time.perf_counter()
+        matcher = FuzzyMatcher()
+        for name in corpus:
+            matcher.add(name)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            next((name for name in corpus if legacy_fuzzy_match(query, name)), None)
+        scan = (time.perf_counter() - start) / query_count
+
+        start = time.perf_counter()
+        for query in queries:
+            matcher.best(query)
+        indexed = (time.perf_counter() - start) / query_count
+
+        print(f"{size:>8}{build * 1000:>10.1f}{scan * 1000:>16.3f}{indexed * 1000:>16.3f}{scan / indexed:>9.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Handler Benchmark - Startup and per-call latency of MCPClient's handler registry
+
+Compares the registry, which imports each lookup script once and keeps its
+caches between calls, against re-executing the script on every call (the way
+handlers used to be loaded). The network is replaced by the saved pages in
+benchmarks/fixtures, so the numbers measure import, setup and parsing only.
+
+Usage: python benchmarks/bench_handlers.py [calls]
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+sys.path.insert(0, ROOT)
+
+# Parsed-response caching on disk would hide the cost being measured
+os.environ["SCTOOLS_CACHE_DISABLE"] = "1"
+
+import http_session
+import response_cache
+import handler_registry
+
+# (module, resource, params)
+CASES = [
+    ("citizens", "profile", {"handle": "KenzoKai"}),
+    ("organizations", "profile", {"sid": "PROTECTORS"}),
+    ("galactapedia", "article", {"articleId": "R4ZGyLQaBl-carrack"})
+]
+
+def fixture_request(method, url, cache=None, deadline=None, **kwargs):
+    """Stand-in for http_session.request that answers with a saved page"""
+    name = "citizen_profile.html" if "/citizens/" in url else "org_profile.html"
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return response_cache.CachedResponse(url, 200, {"Content-Type": "text/html"}, f.read(), "utf-8")
+
+def timed(fn, *args):
+    """Run fn with its progress output suppressed and return (result, milliseconds)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+    return result, elapsed
+
+def reimport_call(client, module_name, resource_name, params):
+    """Execute the handler's script from scratch and call the handler, as a per-call import would"""
+    script_name, function_name = handler_registry.parse_spec(
+        next(r['handler'] for r in client.modules[module_name]['resources'] if r['name'] == resource_name)
+    )
+    spec = importlib.util.spec_from_file_location(script_name, os.path.join(ROOT, f"{script_name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, function_name)(params, client.context)
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    http_session.request = fixture_request
+
+    import client as client_module
+    server_path = os.path.join(ROOT, "server.json")
+    _, startup = timed(client_module.MCPClient, server_path)
+    print(f"MCPClient startup: {startup:.2f} ms")
+    print()
+
+    # Handlers write <handle>_profile.json into the working directory
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        print(f"{'resource':<24} {'first call':>12} {'registry':>12} {'re-import':>12}")
+        for module_name, resource_name, params in CASES:
+            client = client_module.MCPClient(server_path)
+            _, first = timed(client.call_resource, module_name, resource_name, params)
+            warm = sum(timed(client.call_resource, module_name, resource_name, params)[1] for _ in range(calls)) / calls
+            reimport = sum(timed(reimport_call, client, module_name, resource_name, params)[1] for _ in range(calls)) / calls
+            print(f"{module_name + '/' + resource_name:<24} {first:>9.2f} ms {warm:>9.3f} ms {reimport:>9.2f} ms")
+        os.chdir(ROOT)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+HTML Parser Benchmark - Compares parse+extract time and peak memory for each html_parser backend
+
+Runs the citizen (targeted regions and full document), organization profile, organization members and Galactapedia
+category extractors over the saved pages in benchmarks/fixtures. Each backend
+runs in its own subprocess so peak memory is measured independently:
+- py peak: peak Python heap allocations during one parse+extract (tracemalloc)
+- rss delta: growth of the process's peak resident set size over the whole run,
+  which also covers memory allocated by C parsers (lxml, lexbor)
+
+Usage: python benchmarks/bench_html_parsers.py [iterations]
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+sys.path.insert(0, ROOT)
+
+import html_parser
+import citizen_lookup
+import org_lookup
+import galactapedia_lookup
+import wiki_infobox
+
+def _citizen_full(html):
+    # Same fields as parse_citizen_profile, but without restricting the tree to the profile regions
+    return citizen_lookup.get_profile_processor().process_tree(html_parser.parse_html(html))
+
+def _category(html):
+    return galactapedia_lookup.GalactapediaClient().parse_category_html(html, "spacecraft")
+
+# Case name -> (fixture file, extractor)
+CASES = {
+    "citizen_profile": ("citizen_profile.html", citizen_lookup.parse_citizen_profile),
+    "citizen_profile_full": ("citizen_profile.html", _citizen_full),
+    "org_profile": ("org_profile.html", org_lookup.parse_organization_profile),
+    "org_members": ("org_members.html", org_lookup.parse_members_html),
+    "galactapedia_category": ("galactapedia_category.html", _category),
+    "wiki_infobox": ("wiki_ship.html", wiki_infobox.extract_infobox)
+}
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+def run_backend(backend, iterations):
+    """Benchmark every case with one backend and return the results"""
+    html_parser.set_backend(backend)
+    results = {}
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    for case, (fixture, extract) in CASES.items():
+        html = load_fixture(fixture)
+        output = extract(html)  # warm up (compiles selectors)
+
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            extract(html)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        tracemalloc.start()
+        extract(html)
+        _, py_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[case] = {
+            "median_ms": timings[len(timings) // 2] * 1000,
+            "py_peak_kb": py_peak / 1024,
+            "output": output
+        }
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"cases": results, "rss_delta_kb": rss_after - rss_before}
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--worker":
+        print(json.dumps(run_backend(sys.argv[2], int(sys.argv[3]))))
+        return
+
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    backends = html_parser.available_backends()
+    print(f"Backends available: {', '.join(backends)}  ({iterations} iterations per case)\n")
+
+    runs = {}
+    for backend in backends:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", backend, str(iterations)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        runs[backend] = json.loads(output.strip().splitlines()[-1])
+
+    reference = runs.get("html.parser")
+    print(f"{'case':<24}{'backend':<14}{'median ms':>10}{'py peak KB':>12}  output")
+    for case in CASES:
+        for backend in backends:
+            result = runs[backend]["cases"][case]
+            matches = reference is None or result["output"] == reference["cases"][case]["output"]
+            print(f"{case:<24}{backend:<14}{result['median_ms']:>10.2f}{result['py_peak_kb']:>12.0f}  "
+                  f"{'same as html.parser' if matches else 'DIFFERS from html.parser'}")
+        print()
+
+    for backend in backends:
+        print(f"{backend:<14} peak RSS growth over run: {runs[backend]['rss_delta_kb']:.0f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+HTTP Session Benchmark - Compares bare requests.get against the pooled http_session transport
+
+A local HTTP/1.1 server stands in for robertsspaceindustries.com and counts how
+many TCP connections each strategy opens. Against the real site every new
+connection also pays a TLS handshake, so the savings there are larger.
+The per-host rate limiter is switched off so only the transport is measured.
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import http_session
+import rate_limit
+
+BODY = b"<html><body><div class='profile'>" + b"x" * 20000 + b"</div></body></html>"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves a fixed page over keep-alive connections"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+class CountingServer(ThreadingHTTPServer):
+    """HTTP server that counts accepted TCP connections"""
+    daemon_threads = True
+    connections = 0
+
+    def get_request(self):
+        request = super().get_request()
+        self.connections += 1
+        return request
+
+def run(label, fetch, url, count):
+    """Time `count` sequential fetches and report connections opened"""
+    server.connections = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        response = fetch(url, timeout=15)
+        response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {count} requests in {elapsed:.3f}s "
+          f"({elapsed / count * 1000:.2f} ms/request, {server.connections} connections)")
+    return elapsed
+
+def main():
+    global server
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    server = CountingServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/en/citizens/KenzoKai"
+
+    # The stand-in host would otherwise start at the default 10 requests/second
+    rate_limit.ENABLED = False
+
+    bare = run("requests.get", requests.get, url, count)
+    pooled = run("http_session.get", http_session.get, url, count)
+    print(f"Speedup: {bare / pooled:.2f}x")
+
+    http_session.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
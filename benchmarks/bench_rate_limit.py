@@ -0,0 +1,117 @@
+"""
+Rate Limit Benchmark - Throughput of http_session against a throttling stand-in server
+
+The local server accepts at most CAPACITY requests per second (with a small
+burst) and answers anything above that with 429 and a Retry-After header, the
+way the RSI website throttles clients. The same concurrent workload is run
+with rate limiting disabled and enabled. Without it, every throttled request
+is a failed lookup; with it, requests are paced near the server's capacity
+and throttled ones are retried.
+
+Usage: python benchmarks/bench_rate_limit.py [requests] [workers] [capacity]
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_session
+import rate_limit
+
+BODY = b"<html><body><div class='profile'>ok</div></body></html>"
+
+class ThrottlingServer(ThreadingHTTPServer):
+    """HTTP server with a server-side token bucket deciding which requests are served"""
+    daemon_threads = True
+
+    def __init__(self, address, capacity, burst=5):
+        super().__init__(address, ThrottlingHandler)
+        self.capacity = capacity
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.served = 0
+        self.throttled = 0
+
+    def admit(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.capacity)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.served += 1
+                return True
+            self.throttled += 1
+            return False
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.server.admit():
+            self.send_response(200)
+            body = BODY
+        else:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            body = b"Too Many Requests"
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def fetch(url):
+    try:
+        return http_session.get(url, timeout=15).status_code
+    except Exception:
+        return None
+
+def run(label, server, url, count, workers):
+    """Issue `count` lookups from `workers` threads and report how many succeeded"""
+    server.served = server.throttled = 0
+    rate_limit.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        statuses = list(executor.map(fetch, [f"{url}/{i}" for i in range(count)]))
+    elapsed = time.perf_counter() - start
+    ok = statuses.count(200)
+    print(f"{label:<18} {ok}/{count} succeeded in {elapsed:.2f}s "
+          f"({ok / elapsed:.1f} successful req/s, capacity {server.capacity}/s), "
+          f"{server.throttled} throttled by the server")
+    return ok, elapsed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    capacity = float(sys.argv[3]) if len(sys.argv) > 3 else 40
+
+    server = ThrottlingServer(("127.0.0.1", 0), capacity)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/en/citizens"
+
+    rate_limit.ENABLED = False
+    run("no rate limiting", server, url, count, workers)
+
+    # Let the server's bucket refill before the second run
+    time.sleep(1)
+    rate_limit.ENABLED = True
+    run("adaptive limiter", server, url, count, workers)
+    for host, host_stats in rate_limit.stats().items():
+        print(f"  {host}: {host_stats}")
+
+    http_session.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Reference Data Benchmark - Per-call cost of the built-in Galactapedia data before and after freezing
+
+Before, get_hardcoded_articles() and get_common_ship_info() rebuilt their
+dict literals on every call; this is reproduced by evaluating the same data
+as a compiled Python literal. After, both read the frozen structures that
+reference_data loads once.
+
+Usage: python benchmarks/bench_reference_data.py [calls]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reference_data
+import galactapedia_lookup
+
+def report(label, seconds, calls):
+    print(f"{label:<44}{seconds / calls * 1e6:>10.2f} us/call")
+    return seconds
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    client = galactapedia_lookup.GalactapediaClient()
+
+    start = timeit.default_timer()
+    reference = reference_data.get_reference_data()
+    print(f"One-time load of {reference_data.DATA_PATH}: {(timeit.default_timer() - start) * 1000:.2f} ms\n")
+
+    # The literals as they used to be evaluated on each call
+    articles_literal = compile(repr(reference_data.thaw(reference.articles)), "<articles>", "eval")
+    ships_literal = compile(repr(reference_data.thaw(reference.ships)), "<ships>", "eval")
+
+    before = report("before: build articles literal", timeit.timeit(lambda: eval(articles_literal), number=calls), calls)
+    after = report("after:  get_hardcoded_articles()", timeit.timeit(client.get_hardcoded_articles, number=calls), calls)
+    print(f"{'':<44}{before / after:>9.0f}x faster\n")
+
+    before = report("before: build ships literal", timeit.timeit(lambda: eval(ships_literal), number=calls), calls)
+    after = report("after:  get_reference_data().ships", timeit.timeit(lambda: reference_data.get_reference_data().ships, number=calls), calls)
+    print(f"{'':<44}{before / after:>9.0f}x faster\n")
+
+    # End to end: exact ship lookups now only pay for formatting the result
+    lookup = timeit.timeit(lambda: client.get_common_ship_info("carrack"), number=calls)
+    before = report("before: get_common_ship_info (est.)", lookup + timeit.timeit(lambda: eval(ships_literal), number=calls), calls)
+    after = report("after:  get_common_ship_info", lookup, calls)
+    print(f"{'':<44}{before / after:>9.1f}x faster")
+
+if __name__ == "__main__":
+    main()
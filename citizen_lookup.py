@@ -3,113 +3,128 @@ Citizen Lookup Example - Demonstrates how to retrieve citizen profiles from RSI
 """
 
 import requests
+import http_session
 import json
 import sys
-import re
-from bs4 import BeautifulSoup
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import handler_registry
+import response_cache
+import response_processor
+from stale_cache import StaleWhileRevalidateCache
 
-def get_citizen_profile(handle):
-    """Retrieve a citizen's profile from the RSI website"""
-    print(f"Looking up citizen profile for: {handle}")
-    
+# Parsed profiles are kept in memory so repeated lookups skip fetching and parsing.
+# Past their TTL they can still be served while a background refresh runs (see get_citizen_profile)
+PROFILE_CACHE_ENTRIES = 2048
+PROFILE_CACHE_BYTES = 16 * 1024 * 1024
+profile_cache = StaleWhileRevalidateCache(
+    response_cache.TTLS["citizen_profile"], response_cache.HARD_TTLS["citizen_profile"],
+    max_entries=PROFILE_CACHE_ENTRIES, max_bytes=PROFILE_CACHE_BYTES
+)
+
+# Whether stale profiles are served when the caller does not say (`client.py serve` always allows them)
+ALLOW_STALE = os.environ.get("SCTOOLS_ALLOW_STALE", "") in ("1", "true", "yes")
+
+# Upper bound on the concurrent fetches a single profiles_batch call may ask for
+MAX_BATCH_WORKERS = 16
+
+# The profile fields are declared in the citizens module manifest; handlers use the
+# processor their client compiled, and direct callers compile this copy on first use
+MODULE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules", "citizens", "module.json")
+_profile_processor = None
+_profile_processor_lock = threading.Lock()
+
+def get_profile_processor():
+    """Return the compiled responseProcessor for citizen profiles, compiling it on first use"""
+    global _profile_processor
+    if _profile_processor is None:
+        with _profile_processor_lock:
+            if _profile_processor is None:
+                _profile_processor = response_processor.load_processor(MODULE_PATH, "profile")
+    return _profile_processor
+
+def parse_citizen_profile(html, processor=None):
+    """Extract a citizen's profile from the HTML of their RSI page"""
+    # Every field declared in the citizens module manifest is extracted in one pass
+    return (processor or get_profile_processor()).process(html)
+
+def _fetch_citizen_profile(handle, processor=None):
+    """Fetch and parse a citizen's profile, or return None if it could not be retrieved"""
     url = f"https://robertsspaceindustries.com/en/citizens/{handle}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
     
     try:
-        response = requests.get(url, headers=headers, timeout=15)
+        response = http_session.get(url, timeout=15, cache="citizen_profile")
         response.raise_for_status()
         
-        # Parse the HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-        profile_data = {}
-        
-        # Extract avatar image
-        avatar_img = soup.select_one(".profile .thumb img")
-        if avatar_img and avatar_img.has_attr('src'):
-            avatar_src = avatar_img['src']
-            # Make sure it's a full URL
-            if avatar_src.startswith('/'):
-                avatar_src = f"https://robertsspaceindustries.com{avatar_src}"
-            profile_data["avatar"] = avatar_src
-        
-        # Extract profile info from the main profile section
-        profile_section = soup.select_one(".profile")
-        if profile_section:
-            # Extract citizen name
-            name_elem = profile_section.select_one(".info .entry:nth-child(1) .value")
-            if name_elem:
-                profile_data["name"] = name_elem.text.strip()
-            
-            # Extract handle
-            handle_elem = profile_section.select_one(".info .entry:nth-child(2) .value")
-            if handle_elem:
-                profile_data["handle"] = handle_elem.text.strip()
-            
-            # Extract rank
-            rank_elem = profile_section.select_one(".info .entry:nth-child(3) .value")
-            if rank_elem:
-                profile_data["rank"] = rank_elem.text.strip()
-            
-            # Extract rank image
-            rank_img = profile_section.select_one(".info .entry:nth-child(3) .icon img")
-            if rank_img and rank_img.has_attr('src'):
-                profile_data["rankImage"] = rank_img['src']
-        
-        # Extract info from the second left column (enlisted, location, fluency)
-        # Note: There are multiple .left-col elements, we need the one that's not inside .profile
-        left_cols = soup.select("div.left-col")
-        if len(left_cols) > 1:  # The second one contains the enlisted, location, fluency info
-            left_col = left_cols[1]  # Use the second left-col div
-            entries = left_col.select(".entry")
-            
-            for entry in entries:
-                label = entry.select_one(".label")
-                value = entry.select_one(".value")
-                
-                if label and value:
-                    label_text = label.text.strip().lower()
-                    value_text = value.text.strip()
-                    
-                    if "enlisted" in label_text:
-                        profile_data["enlisted"] = value_text
-                    elif "location" in label_text:
-                        profile_data["location"] = re.sub(r'\s+', ' ', value_text)
-                    elif "fluency" in label_text:
-                        profile_data["fluency"] = value_text
-        
-        # Extract bio
-        bio_elem = soup.select_one(".right-col .entry.bio .value")
-        if bio_elem:
-            profile_data["bio"] = bio_elem.text.strip()
-        
-        # Extract main organization info if available
-        main_org_elem = soup.select_one(".main-org .info .entry:nth-child(1) .value")
-        if main_org_elem:
-            profile_data["mainOrg"] = main_org_elem.text.strip()
-            
-            # Extract SID
-            org_sid_elem = soup.select_one(".main-org .info .entry:nth-child(2) .value")
-            if org_sid_elem:
-                profile_data["mainOrgSID"] = org_sid_elem.text.strip()
-            
-            # Extract org rank
-            org_rank_elem = soup.select_one(".main-org .info .entry:nth-child(3) .value")
-            if org_rank_elem:
-                profile_data["mainOrgRank"] = org_rank_elem.text.strip()
-            
-            # Extract org logo
-            org_logo = soup.select_one(".main-org .thumb img")
-            if org_logo and org_logo.has_attr('src'):
-                profile_data["mainOrgLogo"] = org_logo['src']
-        
-        return profile_data
+        return parse_citizen_profile(response.text, processor)
         
     except requests.exceptions.RequestException as e:
         print(f"Error retrieving citizen profile: {e}")
         return None
 
+def get_citizen_profile(handle, allow_stale=None, processor=None):
+    """Retrieve a citizen's profile from the RSI website
+    
+    With allow_stale, a cached profile past its TTL (but within its hard TTL)
+    is returned immediately and refreshed in the background. `processor`
+    overrides the responseProcessor compiled from modules/citizens/module.json.
+    """
+    print(f"Looking up citizen profile for: {handle}")
+    
+    if allow_stale is None:
+        allow_stale = ALLOW_STALE
+    
+    # Handles are case-insensitive on the RSI website
+    cache_key = handle.lower()
+    return profile_cache.get(cache_key, lambda: _fetch_citizen_profile(handle, processor), allow_stale)
+
+def handle_profile(params, context):
+    """Handler for citizens/profile; outside the server it also saves the profile to <handle>_profile.json"""
+    handle = params['handle']
+    filename = handler_registry.result_filename(handle, "_profile.json") if context.save_results else None
+    print(f"Using citizen_lookup.py to retrieve profile for: {handle}")
+    
+    profile = get_citizen_profile(handle, context.allow_stale, context.get_processor("citizens", "profile"))
+    if not profile:
+        print(f"Error: Could not retrieve profile for {handle}")
+        return None
+    
+    if filename:
+        with open(filename, 'w') as f:
+            json.dump(profile, f, indent=2)
+    return profile
+
+def handle_profiles_batch(params, context):
+    """Handler for citizens/profiles_batch; streams one result per handle as it completes"""
+    handles = handler_registry.list_param(params, 'handles', 'handlesFile', context)
+    workers = handler_registry.int_param(params, 'workers', 8, 1, MAX_BATCH_WORKERS)
+    print(f"Using citizen_lookup.py to retrieve {len(handles)} profiles with {workers} workers", file=sys.stderr)
+    return _stream_profiles(handles, workers, context.allow_stale, context.get_processor("citizens", "profile"))
+
+def _stream_profiles(handles, workers, allow_stale, processor=None):
+    """Yield one result per handle in completion order"""
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {executor.submit(get_citizen_profile, handle, allow_stale, processor): handle for handle in handles}
+    try:
+        for future in as_completed(futures):
+            handle = futures[future]
+            try:
+                profile = future.result()
+            except Exception as e:
+                yield {"handle": handle, "error": str(e)}
+                continue
+            
+            if profile:
+                yield {"handle": handle, "profile": profile}
+            else:
+                yield {"handle": handle, "error": f"Could not retrieve profile for {handle}"}
+    finally:
+        # Stop queued lookups if the consumer goes away before the batch finishes
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
 def display_profile(profile):
     """Display the citizen profile in a formatted way"""
     if not profile:
@@ -2,20 +2,54 @@ import json
 import argparse
 import os
 import sys
-import importlib.util
+import re
+import threading
+import types
+from urllib.parse import quote
+import handler_registry
+import singleflight
+import startup_profile
 
-# Import specialized modules dynamically when needed
-def import_module_from_file(module_name, file_path):
-    """Import a module from file path dynamically"""
-    spec = importlib.util.spec_from_file_location(module_name, file_path)
-    if spec is None:
-        return None
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module
+def _normalize_value(value, leaf=None):
+    """Strip whitespace from a parameter value and the strings nested in it
+
+    Other leaf values (numbers, booleans, None) are passed through `leaf` when
+    given, so the flight key can compare them as strings.
+    """
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(item, leaf) for item in value]
+    if isinstance(value, dict):
+        return {key: _normalize_value(item, leaf) for key, item in value.items()}
+    return leaf(value) if leaf else value
+
+def normalize_params(params):
+    """Return the parameters a call is made with, so calls that share a flight_key make the same request"""
+    return _normalize_value(params)
+
+def flight_key(module_name, resource, params):
+    """Key identifying a call by module, resource and its normalized parameters with defaults filled in"""
+    values = {param['name']: param['default'] for param in resource.get('parameters', []) if 'default' in param}
+    values.update(params)
+    # Numbers arrive as strings from the command line and as numbers over JSON
+    normalized = json.dumps(_normalize_value(values, str), sort_keys=True)
+    return (module_name, resource['name'], normalized)
 
 class MCPClient:
-    def __init__(self, server_config_path):
+    def __init__(self, server_config_path, allow_stale=False, raise_errors=False, save_results=True, read_files=True):
+        # Settings handed to every lookup handler (see handler_registry.HandlerContext)
+        self.context = handler_registry.HandlerContext(allow_stale, save_results, self._resource_processor, read_files)
+        
+        # A server re-raises handler failures so it can report them to the caller instead of only printing them
+        self.raise_errors = raise_errors
+        
+        # Handlers declared in module.json; each lookup script is imported on first use and kept warm
+        self.handlers = handler_registry.HandlerRegistry()
+        
+        # Concurrent identical calls share one upstream fetch and parse
+        self._flight = singleflight.SingleFlight()
+        
         try:
             # Load server configuration
             with open(server_config_path, 'r') as f:
@@ -27,12 +61,23 @@ class MCPClient:
                 module_path = os.path.join(os.path.dirname(server_config_path), module_info['source'])
                 with open(module_path, 'r') as f:
                     self.modules[module_info['name']] = json.load(f)
+            
+            # Register the handler each resource declares; nothing is imported until it is called
+            for module_name, module in self.modules.items():
+                self.handlers.register_module(module_name, module)
         except FileNotFoundError as e:
             print(f"Error: Could not find file: {e.filename}")
             sys.exit(1)
         except json.JSONDecodeError as e:
             print(f"Error: Invalid JSON in configuration file: {e}")
             sys.exit(1)
+        except (KeyError, ValueError) as e:
+            print(f"Error: Invalid resource in module configuration: {e}")
+            sys.exit(1)
+        
+        # responseProcessors are compiled on first use and then reused, so startup never imports the parser
+        self._processors = {}
+        self._processors_lock = threading.Lock()
     
     def list_modules(self):
         """List all available modules"""
@@ -57,6 +102,8 @@ class MCPClient:
                 default = f", Default: {param.get('default')}" if 'default' in param else ""
                 print(f"    - {param['name']} ({param.get('type', 'string')}): {required}{default}")
                 print(f"      {param.get('description', 'No description')}")
+            if 'requiredOneOf' in resource:
+                print(f"  Requires one of: {', '.join(resource['requiredOneOf'])}")
             print()
     
     def call_resource(self, module_name, resource_name, params=None):
@@ -68,190 +115,160 @@ class MCPClient:
             print(f"Module '{module_name}' not found")
             return None
         
-        module = self.modules[module_name]
-        resource = None
-        for res in module.get('resources', []):
-            if res['name'] == resource_name:
-                resource = res
-                break
-        
+        resource = self.find_resource(module_name, resource_name)
         if not resource:
             print(f"Resource '{resource_name}' not found in module '{module_name}'")
             return None
         
-        # Use specialized lookup scripts based on the module
-        if module_name == 'citizens' and resource_name == 'profile':
-            # Use citizen_lookup.py for citizen profiles
-            return self._call_citizen_lookup(params)
+        # The handler sees the same normalized values the flight key is built from
+        params = normalize_params(params)
         
-        elif module_name == 'organizations':
-            # Use org_lookup.py for organization profiles and members
-            return self._call_org_lookup(resource_name, params)
+        # Streamed results can only be consumed once, so each caller gets its own generator
+        key = flight_key(module_name, resource, params)
+        return self._flight.do(key, self._dispatch, module_name, resource, params,
+                               shareable=lambda result: not isinstance(result, types.GeneratorType))
+    
+    def find_resource(self, module_name, resource_name):
+        """Return a resource's definition from its module manifest, or None"""
+        for resource in self.modules.get(module_name, {}).get('resources', []):
+            if resource['name'] == resource_name:
+                return resource
+        return None
+    
+    def missing_parameters(self, resource, params):
+        """Return the names of required parameters that were not given and have no default
+
+        A resource's `requiredOneOf` names alternatives of which at least one must be given.
+        """
+        missing = [
+            param['name'] for param in resource.get('parameters', [])
+            if param.get('required', False) and param['name'] not in params and 'default' not in param
+        ]
+        alternatives = resource.get('requiredOneOf')
+        if alternatives and not any(name in params for name in alternatives):
+            missing.append(" or ".join(alternatives))
+        return missing
+    
+    def _dispatch(self, module_name, resource, params):
+        """Route a call to the handler or declarative processor that serves it"""
+        resource_name = resource['name']
         
-        elif module_name == 'galactapedia':
-            # Use galactapedia_lookup.py for Galactapedia resources
-            return self._call_galactapedia_lookup(resource_name, params)
+        if (module_name, resource_name) in self.handlers:
+            # Lookup scripts declared as the resource's handler in module.json
+            return self._call_handler(module_name, resource, params)
         
-        elif module_name == 'wiki':
-            # Use simple_example.py for wiki resources
-            return self._call_wiki_lookup(resource_name, params)
+        elif 'responseProcessor' in resource:
+            # Resources declared entirely in module.json are fetched and extracted generically
+            return self._call_declarative_resource(module_name, resource, params)
         
         else:
             print(f"No specialized handler for module '{module_name}', resource '{resource_name}'")
             return None
     
-    def _call_citizen_lookup(self, params):
-        """Use citizen_lookup.py to retrieve citizen profiles"""
-        if 'handle' not in params:
-            print("Error: Missing required parameter 'handle'")
-            return None
-        
-        handle = params['handle']
-        print(f"Using citizen_lookup.py to retrieve profile for: {handle}")
-        
-        # Import the citizen_lookup module
-        citizen_module = import_module_from_file('citizen_lookup', 'citizen_lookup.py')
-        if not citizen_module:
-            print("Error: Could not import citizen_lookup.py")
-            return None
-        
-        # Call the get_citizen_profile function
-        try:
-            profile = citizen_module.get_citizen_profile(handle)
-            if profile:
-                # Save to JSON file (this is done in the main function of citizen_lookup.py)
-                # but we'll do it here for consistency
-                with open(f"{handle}_profile.json", 'w') as f:
-                    json.dump(profile, f, indent=2)
-                return profile
-            else:
-                print(f"Error: Could not retrieve profile for {handle}")
-                return None
-        except Exception as e:
-            print(f"Error calling get_citizen_profile: {e}")
+    def get_processor(self, module_name, resource):
+        """Return a resource's compiled responseProcessor, compiling it on first use"""
+        key = (module_name, resource['name'])
+        with self._processors_lock:
+            if key not in self._processors:
+                import response_processor
+                self._processors[key] = response_processor.ResponseProcessor(
+                    resource['responseProcessor'], self.modules[module_name].get('baseUrl')
+                )
+            return self._processors[key]
+    
+    def _resource_processor(self, module_name, resource_name):
+        """Return the compiled responseProcessor of a resource by name, or None if it declares none"""
+        resource = self.find_resource(module_name, resource_name)
+        if resource is None or 'responseProcessor' not in resource:
             return None
+        return self.get_processor(module_name, resource)
     
-    def _call_org_lookup(self, resource_name, params):
-        """Use org_lookup.py to retrieve organization profiles and members"""
-        if 'sid' not in params:
-            print("Error: Missing required parameter 'sid'")
+    def _call_handler(self, module_name, resource, params):
+        """Check required parameters and call the resource's handler"""
+        resource_name = resource['name']
+        missing = self.missing_parameters(resource, params)
+        if missing:
+            print(f"Error: Missing required parameter '{missing[0]}'")
             return None
         
-        sid = params['sid']
-        print(f"Using org_lookup.py to retrieve {resource_name} for organization: {sid}")
-        
-        # Import the org_lookup module
-        org_module = import_module_from_file('org_lookup', 'org_lookup.py')
-        if not org_module:
-            print("Error: Could not import org_lookup.py")
+        try:
+            handler = self.handlers.get(module_name, resource_name)
+        except (ImportError, AttributeError) as e:
+            print(f"Error: Could not load handler for {module_name}/{resource_name}: {e}")
+            if self.raise_errors:
+                raise
             return None
+        startup_profile.mark("handler imported")
         
         try:
-            if resource_name == 'profile':
-                # Call the get_organization_profile function
-                org_data = org_module.get_organization_profile(sid)
-                if org_data:
-                    # Save to JSON file
-                    with open(f"{sid}_profile.json", 'w') as f:
-                        json.dump(org_data, f, indent=2)
-                    return org_data
-            elif resource_name == 'members':
-                # Call the get_organization_members function
-                members = org_module.get_organization_members(sid)
-                if members:
-                    # Save to JSON file
-                    with open(f"{sid}_members.json", 'w') as f:
-                        json.dump(members, f, indent=2)
-                    return members
-            else:
-                print(f"Error: Unsupported resource '{resource_name}' for organizations module")
-                return None
+            return handler(params, self.context)
         except Exception as e:
-            print(f"Error calling org_lookup functions: {e}")
+            print(f"Error calling {module_name}/{resource_name}: {e}")
+            if self.raise_errors:
+                raise
             return None
     
-    def _call_galactapedia_lookup(self, resource_name, params):
-        """Use galactapedia_lookup.py to retrieve Galactapedia resources"""
-        # Import the galactapedia_lookup module
-        galactapedia_module = import_module_from_file('galactapedia_lookup', 'galactapedia_lookup.py')
-        if not galactapedia_module:
-            print("Error: Could not import galactapedia_lookup.py")
-            return None
+    def _call_declarative_resource(self, module_name, resource, params):
+        """Fetch a resource from its module's baseUrl and apply its compiled responseProcessor"""
+        module = self.modules[module_name]
         
-        try:
-            # Create a GalactapediaClient instance
-            client = galactapedia_module.GalactapediaClient()
-            
-            if resource_name == 'search':
-                if 'query' not in params:
-                    print("Error: Missing required parameter 'query'")
-                    return None
-                query = params['query']
-                print(f"Using galactapedia_lookup.py to search for: {query}")
-                return client.search_articles(query)
-            
-            elif resource_name == 'article':
-                if 'articleId' not in params:
-                    print("Error: Missing required parameter 'articleId'")
-                    return None
-                article_id = params['articleId']
-                print(f"Using galactapedia_lookup.py to retrieve article: {article_id}")
-                return client.get_article(article_id)
-            
-            elif resource_name == 'category':
-                if 'categoryName' not in params:
-                    print("Error: Missing required parameter 'categoryName'")
-                    return None
-                category_name = params['categoryName']
-                print(f"Using galactapedia_lookup.py to retrieve category: {category_name}")
-                return client.get_category(category_name)
-            
-            elif resource_name == 'categories':
-                print("Using galactapedia_lookup.py to retrieve all categories")
-                return client.get_categories()
-            
-            else:
-                print(f"Error: Unsupported resource '{resource_name}' for galactapedia module")
+        # Fill in defaults and check required parameters
+        values = {}
+        for param in resource.get('parameters', []):
+            if param['name'] in params:
+                values[param['name']] = params[param['name']]
+            elif 'default' in param:
+                values[param['name']] = param['default']
+            elif param.get('required', False):
+                print(f"Error: Missing required parameter '{param['name']}'")
                 return None
-        except Exception as e:
-            print(f"Error calling galactapedia_lookup functions: {e}")
-            return None
-    
-    def _call_wiki_lookup(self, resource_name, params):
-        """Use simple_example.py to retrieve wiki resources"""
-        # Import the simple_example module
-        wiki_module = import_module_from_file('simple_example', 'simple_example.py')
-        if not wiki_module:
-            print("Error: Could not import simple_example.py")
+        
+        # Parameters named in the path are substituted, the rest are sent as the query string
+        path = resource.get('path', '/')
+        path_params = set(re.findall(r'\{(\w+)\}', path))
+        missing = path_params - set(values)
+        if missing:
+            print(f"Error: Missing path parameters: {', '.join(sorted(missing))}")
             return None
+        url = module['baseUrl'] + path.format(**{name: quote(str(values[name]), safe='') for name in path_params})
+        query = {name: value for name, value in values.items() if name not in path_params}
+        print(f"Fetching {url}")
         
+        import http_session
         try:
-            if resource_name == 'search':
-                if 'srsearch' not in params:
-                    print("Error: Missing required parameter 'srsearch'")
-                    return None
-                query = params['srsearch']
-                print(f"Using simple_example.py to search wiki for: {query}")
-                return wiki_module.search_wiki(query)
-            
-            elif resource_name == 'wiki_page':
-                if 'page' not in params:
-                    print("Error: Missing required parameter 'page'")
-                    return None
-                page = params['page']
-                print(f"Using simple_example.py to retrieve wiki page: {page}")
-                return wiki_module.get_wiki_page(page)
-            
-            else:
-                print(f"Error: Unsupported resource '{resource_name}' for wiki module")
-                return None
+            response = http_session.get(url, params=query or None, timeout=15)
+            response.raise_for_status()
+            return self.get_processor(module_name, resource).process(response.text)
         except Exception as e:
-            print(f"Error calling simple_example functions: {e}")
+            print(f"Error calling {module_name}/{resource['name']}: {e}")
+            if self.raise_errors:
+                raise
             return None
 
+def stream_ndjson(items, out=None):
+    """Write each item as one JSON line while keeping progress messages off stdout
+
+    Streaming handlers print their own progress to stderr, since it is
+    written before the stream starts.
+    """
+    out = out or sys.stdout
+    previous_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        for count, item in enumerate(items):
+            out.write(json.dumps(item) + "\n")
+            out.flush()
+            if count == 0:
+                startup_profile.mark("first item written")
+    finally:
+        sys.stdout = previous_stdout
+
 def main():
+    startup_profile.mark("main started")
     parser = argparse.ArgumentParser(description='MCP Client')
     parser.add_argument('--server', default='server.json', help='Path to server configuration file')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Run the command in a fresh interpreter and report import times and time to first byte')
     subparsers = parser.add_subparsers(dest='command', help='Command to execute')
     
     # List modules command
@@ -267,15 +284,35 @@ def main():
     call_parser.add_argument('resource', help='Resource name')
     call_parser.add_argument('--params', nargs='+', help='Parameters in the format key=value')
     
+    # Serve command (long-running process)
+    serve_parser = subparsers.add_parser('serve', help='Run as a long-running server')
+    serve_parser.add_argument('--transport', choices=['stdio', 'http'], default='stdio', help='Server transport')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='Host to bind when using the http transport')
+    serve_parser.add_argument('--port', type=int, default=8765, help='Port to bind when using the http transport')
+    serve_parser.add_argument('--workers', type=int, default=8, help='Maximum number of concurrent requests')
+    serve_parser.add_argument('--no-stale', action='store_true',
+                              help='Fetch profiles past their TTL before responding instead of refreshing them in the background')
+    
     args = parser.parse_args()
     
-    # Create client
-    client = MCPClient(args.server)
+    if args.profile_startup:
+        profiled_args = [arg for arg in sys.argv[1:] if arg != '--profile-startup']
+        sys.exit(startup_profile.run_profiled(os.path.abspath(__file__), profiled_args))
+    startup_profile.mark("arguments parsed")
+    
+    # Create client (a long-running server answers from stale profiles while refreshing them,
+    # and never reads or writes files named by request parameters)
+    serving = args.command == 'serve'
+    client = MCPClient(args.server, allow_stale=serving and not args.no_stale, raise_errors=serving,
+                       save_results=not serving, read_files=not serving)
+    startup_profile.mark("configuration loaded")
     
     if args.command == 'list-modules':
         client.list_modules()
+        startup_profile.mark("output written")
     elif args.command == 'list-resources':
         client.list_resources(args.module)
+        startup_profile.mark("output written")
     elif args.command == 'call':
         params = {}
         if args.params:
@@ -284,9 +321,23 @@ def main():
                 params[key] = value
         
         result = client.call_resource(args.module, args.resource, params)
-        if result:
+        startup_profile.mark("handler returned")
+        if isinstance(result, types.GeneratorType):
+            # Streamed resources are written as NDJSON, one line per item as it completes
+            try:
+                stream_ndjson(result)
+            except Exception as e:
+                print(f"Error calling {args.module}/{args.resource}: {e}")
+        elif result:
             print("\nResponse:")
             print(json.dumps(result, indent=2))
+        startup_profile.mark("output written")
+    elif args.command == 'serve':
+        import mcp_server
+        if args.transport == 'http':
+            mcp_server.serve_http(client, args.host, args.port, args.workers)
+        else:
+            mcp_server.serve_stdio(client, args.workers)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,121 @@
+"""
+Fuzzy Match - Precomputed deletion dictionary for typo-tolerant lookups (SymSpell style)
+
+Every indexed term is stored under all the strings obtained by deleting up
+to `max_distance` of its characters. A query generates its own deletions and
+only the terms sharing one of them are compared with an edit distance, so a
+lookup costs a handful of dictionary probes instead of a scan over the corpus.
+Used for ship names in get_common_ship_info and for title terms in the local
+Galactapedia index.
+"""
+
+from bisect import bisect_left
+
+def edit_distance(a, b, limit=None):
+    """Optimal string alignment distance (insertions, deletions, substitutions and adjacent swaps)
+
+    Returns limit + 1 as soon as the distance is known to exceed limit.
+    """
+    if a == b:
+        return 0
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+def allowed_distance(term):
+    """Number of typos tolerated for a term of this length"""
+    if len(term) < 4:
+        return 0
+    if len(term) < 7:
+        return 1
+    return 2
+
+def _deletes(term, max_distance):
+    """Every string obtained by deleting up to max_distance characters from term"""
+    results = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for word in frontier:
+            if len(word) <= 1:
+                continue
+            for i in range(len(word)):
+                next_frontier.add(word[:i] + word[i + 1:])
+        next_frontier -= results
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+class FuzzyMatcher:
+    """Deletion dictionary mapping terms (and their typos) to the values indexed under them"""
+
+    def __init__(self, max_distance=2):
+        self.max_distance = max_distance
+        self.terms = {}    # term -> list of values
+        self.deletes = {}  # deletion variant -> set of terms
+        self._sorted_terms = None
+
+    def add(self, term, value=None):
+        """Index a term, optionally with a value returned by lookups"""
+        values = self.terms.get(term)
+        if values is None:
+            values = self.terms[term] = []
+            for variant in _deletes(term, self.max_distance):
+                self.deletes.setdefault(variant, set()).add(term)
+            self._sorted_terms = None
+        if value is not None and value not in values:
+            values.append(value)
+
+    def lookup(self, query, max_distance=None):
+        """Return (term, distance, values) for indexed terms within max_distance of query, closest first"""
+        if max_distance is None:
+            max_distance = min(allowed_distance(query), self.max_distance)
+        if query in self.terms and max_distance == 0:
+            return [(query, 0, self.terms[query])]
+
+        candidates = set()
+        for variant in _deletes(query, max_distance):
+            candidates.update(self.deletes.get(variant, ()))
+
+        matches = []
+        for term in candidates:
+            distance = edit_distance(query, term, max_distance)
+            if distance <= max_distance:
+                matches.append((term, distance, self.terms[term]))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def best(self, query, max_distance=None):
+        """Return the closest indexed term's (term, distance, values), or None"""
+        matches = self.lookup(query, max_distance)
+        return matches[0] if matches else None
+
+    def complete(self, prefix):
+        """Return the indexed terms starting with prefix, in sorted order"""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.terms)
+        matches = []
+        position = bisect_left(self._sorted_terms, prefix)
+        while position < len(self._sorted_terms) and self._sorted_terms[position].startswith(prefix):
+            matches.append(self._sorted_terms[position])
+            position += 1
+        return matches
+
+    def __contains__(self, term):
+        return term in self.terms
+
+    def __len__(self):
+        return len(self.terms)
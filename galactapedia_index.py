@@ -0,0 +1,302 @@
+"""
+Galactapedia Index - Local inverted index with BM25 ranking over Galactapedia articles
+
+Articles listed on category pages (title, description and tags) plus any
+article content fetched later are tokenized into one inverted index, so
+searches are answered from memory instead of re-fetching and re-scoring every
+category on each query. The index is saved as JSON in the cache directory and
+refreshed one category at a time: a category is only re-indexed when the
+fingerprint of its article listing changes. The same documents double as an
+article id -> summary map, so get_article can skip walking the categories. Query terms that are not indexed
+fall back to prefix matches, then to typo corrections against title words.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+import response_cache
+from fuzzy_match import FuzzyMatcher
+
+INDEX_PATH = os.path.join(response_cache.CACHE_DIR, "galactapedia_index.json")
+INDEX_VERSION = 1
+
+# Term weights per field (a title match counts three times a content match)
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "description": 1.0,
+    "content": 1.0
+}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Query terms missing from the vocabulary match indexed terms they prefix, at a discount
+PREFIX_MIN_LENGTH = 3
+PREFIX_WEIGHT = 0.5
+
+# Query terms matching nothing else are corrected against title and tag terms;
+# a correction with n typos is weighted FUZZY_WEIGHT / n
+FUZZY_FIELDS = ("title", "tags")
+FUZZY_WEIGHT = 0.5
+
+# Bonuses on top of BM25 so exact title matches still rank first
+EXACT_TITLE_BONUS = 100.0
+TITLE_PHRASE_BONUS = 25.0
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    """Split text into lower-case alphanumeric terms"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+def fingerprint(articles):
+    """Hash a category listing so unchanged categories can be skipped"""
+    digest = hashlib.sha1()
+    for article in sorted(articles, key=lambda a: a.get("id", "")):
+        digest.update(json.dumps([article.get("id"), article.get("title"), article.get("description")]).encode("utf-8"))
+    return digest.hexdigest()
+
+class GalactapediaIndex:
+    """Inverted index over article summaries, refreshed per category"""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.docs = {}        # article id -> article summary (with "content" once known)
+        self.categories = {}  # category -> {"fingerprint", "ids", "refreshed_at"}
+        self.postings = {}    # term -> {article id: weighted term frequency}
+        self.doc_lengths = {}
+        self._total_length = 0.0
+        self._vocabulary = None
+        self._fuzzy = None
+        self._lock = threading.RLock()
+        self.dirty = False  # True when there are changes not yet saved
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Load a saved index, or return an empty one if there is none"""
+        index = cls(path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+
+        if data.get("version") != INDEX_VERSION:
+            return index
+
+        index.categories = data.get("categories", {})
+        for article in data.get("docs", []):
+            index._add_doc(article)
+        index.dirty = False
+        return index
+
+    def save(self):
+        """Write the index to disk atomically"""
+        with self._lock:
+            data = {
+                "version": INDEX_VERSION,
+                "categories": self.categories,
+                "docs": list(self.docs.values())
+            }
+            # Held while writing so concurrent category refreshes don't share the temp file
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+
+    def is_stale(self, category, ttl):
+        """Check whether a category has never been indexed or was refreshed more than ttl seconds ago"""
+        with self._lock:
+            entry = self.categories.get(category)
+            return entry is None or time.time() - entry.get("refreshed_at", 0) >= ttl
+
+    def update_category(self, category, articles):
+        """Re-index a category's articles if its listing changed; return True when the index changed"""
+        new_fingerprint = fingerprint(articles)
+        with self._lock:
+            entry = self.categories.get(category)
+            if entry is not None and entry["fingerprint"] == new_fingerprint:
+                # Nothing to re-index, but the new refresh time must still be saved
+                entry["refreshed_at"] = time.time()
+                self.dirty = True
+                return False
+
+            old_ids = set(entry["ids"]) if entry else set()
+            new_ids = [article["id"] for article in articles if article.get("id")]
+
+            # Drop this category from articles no longer listed in it
+            for article_id in old_ids.difference(new_ids):
+                doc = self.docs.get(article_id)
+                if doc is None:
+                    continue
+                tags = [tag for tag in doc.get("tags", []) if tag != category]
+                if tags:
+                    self._add_doc(dict(doc, tags=tags))
+                else:
+                    self._remove_doc(article_id)
+
+            for article in articles:
+                if not article.get("id"):
+                    continue
+                existing = self.docs.get(article["id"], {})
+                tags = list(existing.get("tags", []))
+                for tag in article.get("tags", [category]):
+                    if tag not in tags:
+                        tags.append(tag)
+                merged = dict(existing)
+                merged.update(article)
+                merged["tags"] = tags
+                self._add_doc(merged)
+
+            self.categories[category] = {
+                "fingerprint": new_fingerprint,
+                "ids": new_ids,
+                "refreshed_at": time.time()
+            }
+            return True
+
+    def update_article(self, article):
+        """Merge a fetched article (e.g. with its content) into the index; return True when it changed"""
+        with self._lock:
+            existing = self.docs.get(article.get("id"))
+            if existing is None:
+                return False
+            merged = dict(existing)
+            for field in ("title", "description", "content"):
+                if article.get(field):
+                    merged[field] = article[field]
+            if merged == existing:
+                return False
+            self._add_doc(merged)
+            return True
+
+    def get(self, article_id):
+        """Return the indexed summary of an article, or None if no indexed category lists it"""
+        with self._lock:
+            doc = self.docs.get(article_id)
+            return self._summary(doc) if doc is not None else None
+
+    def search(self, query, limit=None):
+        """Return the article summaries matching query, best first"""
+        query_terms = tokenize(query)
+        if not query_terms:
+            return []
+
+        with self._lock:
+            doc_count = len(self.docs)
+            if not doc_count:
+                return []
+            average_length = self._total_length / doc_count
+
+            scores = {}
+            for term in set(query_terms):
+                for matched_term, weight in self._expand(term):
+                    postings = self.postings[matched_term]
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for article_id, frequency in postings.items():
+                        norm = K1 * (1 - B + B * self.doc_lengths[article_id] / average_length)
+                        score = weight * idf * frequency * (K1 + 1) / (frequency + norm)
+                        scores[article_id] = scores.get(article_id, 0.0) + score
+
+            normalized_query = " ".join(query_terms)
+            for article_id in scores:
+                title = " ".join(tokenize(self.docs[article_id].get("title", "")))
+                if title == normalized_query:
+                    scores[article_id] += EXACT_TITLE_BONUS
+                elif normalized_query in title:
+                    scores[article_id] += TITLE_PHRASE_BONUS
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            if limit is not None:
+                ranked = ranked[:limit]
+            return [self._summary(self.docs[article_id]) for article_id, _ in ranked]
+
+    def stats(self):
+        """Return the number of indexed articles, terms and categories"""
+        with self._lock:
+            return {
+                "articles": len(self.docs),
+                "terms": len(self.postings),
+                "categories": len(self.categories)
+            }
+
+    def _expand(self, term):
+        """Return (indexed term, weight) pairs a query term matches"""
+        if term in self.postings:
+            return [(term, 1.0)]
+        if len(term) < PREFIX_MIN_LENGTH:
+            return []
+
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        matches = []
+        position = bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            matches.append((self._vocabulary[position], PREFIX_WEIGHT))
+            position += 1
+        if matches:
+            return matches
+
+        # Misspelled terms (e.g. "pheonix") are corrected against title words
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyMatcher()
+            for doc in self.docs.values():
+                for field in FUZZY_FIELDS:
+                    for word in tokenize(self._field_text(doc, field)):
+                        self._fuzzy.add(word)
+        return [(word, FUZZY_WEIGHT / distance) for word, distance, _ in self._fuzzy.lookup(term) if word in self.postings]
+
+    def _field_text(self, doc, field):
+        """Text of one field, joining list fields such as tags"""
+        value = doc.get(field)
+        return " ".join(value) if isinstance(value, list) else value
+
+    def _summary(self, doc):
+        """Copy of an indexed article without its (possibly long) content"""
+        return {key: value for key, value in doc.items() if key != "content"}
+
+    def _add_doc(self, article):
+        """Index an article, replacing any previous version"""
+        article_id = article["id"]
+        if article_id in self.docs:
+            self._remove_doc(article_id)
+
+        frequencies = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(self._field_text(article, field)):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[article_id] = frequency
+        length = sum(frequencies.values())
+
+        self.docs[article_id] = article
+        self.doc_lengths[article_id] = length
+        self._total_length += length
+        self._vocabulary = None
+        self._fuzzy = None
+        self.dirty = True
+
+    def _remove_doc(self, article_id):
+        """Remove an article and its postings"""
+        article = self.docs.pop(article_id)
+        for field in FIELD_WEIGHTS:
+            for term in tokenize(self._field_text(article, field)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(article_id, None)
+                    if not postings:
+                        del self.postings[term]
+        self._total_length -= self.doc_lengths.pop(article_id)
+        self._vocabulary = None
+        self._fuzzy = None
+        self.dirty = True
@@ -2,310 +2,188 @@
 Galactapedia Lookup Example - Demonstrates how to retrieve information from the RSI Galactapedia
 """
 
-import requests
+import http_session
 import json
+import os
 import sys
 import re
 import time
 import textwrap
-from bs4 import BeautifulSoup
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import html_parser
+import galactapedia_index
+import galactapedia_mirror
 from urllib.parse import quote
+import response_cache
+from memory_cache import LRUCache
+import reference_data
+
+# Limits for the in-memory caches of parsed results
+ARTICLE_CACHE_ENTRIES = 512
+ARTICLE_CACHE_BYTES = 8 * 1024 * 1024
+SEARCH_CACHE_ENTRIES = 256
+SEARCH_CACHE_BYTES = 4 * 1024 * 1024
+CATEGORY_CACHE_ENTRIES = 64
+CATEGORY_CACHE_BYTES = 8 * 1024 * 1024
+
+# Seconds an article whose page could not be read stays cached before it is fetched again
+FAILED_ARTICLE_TTL = 60
+
+# Categories indexed for the local search fallback
+SEARCH_CATEGORIES = ["spacecraft", "planets", "people", "history", "military",
+                     "species", "locations", "organizations", "technology"]
+
+# Categories searched for an article that is not otherwise known
+ARTICLE_CATEGORIES = ["spacecraft", "planets", "people", "history", "military"]
+
+# Maximum number of category pages fetched at once
+CATEGORY_WORKERS = 5
+
+# Maximum number of article pages fetched at once while building the mirror
+MIRROR_WORKERS = int(os.environ.get("SCTOOLS_MIRROR_WORKERS", "4"))
+
+# Set SCTOOLS_GALACTAPEDIA_OFFLINE=1 to answer every lookup from the local mirror
+OFFLINE = os.environ.get("SCTOOLS_GALACTAPEDIA_OFFLINE", "") in ("1", "true", "yes")
 
 class GalactapediaClient:
-    def __init__(self):
+    def __init__(self, offline=None):
         self.base_url = "https://robertsspaceindustries.com/galactapedia"
         self.api_url = "https://robertsspaceindustries.com/api/galactapedia"
+        # The User-Agent comes from the shared session in http_session
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
-        # Store article cache to avoid repeated requests
-        self.article_cache = {}
-        self.search_cache = {}
-        self.category_cache = {}
+        # Bounded caches of parsed results to avoid repeated requests and parsing
+        self.article_cache = LRUCache(max_entries=ARTICLE_CACHE_ENTRIES, max_bytes=ARTICLE_CACHE_BYTES, ttl=response_cache.TTLS["galactapedia_article"])
+        self.search_cache = LRUCache(max_entries=SEARCH_CACHE_ENTRIES, max_bytes=SEARCH_CACHE_BYTES, ttl=response_cache.TTLS["galactapedia_search"])
+        self.category_cache = LRUCache(max_entries=CATEGORY_CACHE_ENTRIES, max_bytes=CATEGORY_CACHE_BYTES, ttl=response_cache.TTLS["galactapedia_category"])
+        # Local full-text index, loaded from disk on first use
+        self._index = None
+        self._index_lock = threading.Lock()
+        # Offline clients never touch the network and answer from the mirror
+        self.offline = OFFLINE if offline is None else offline
+        self._mirror = None
     
     def get_hardcoded_articles(self):
-        """Return dictionary of hardcoded articles for common ships and topics"""
-        return {
-            # Anvil Aerospace Ships
-            "R4ZGyLQaBl-carrack": {
-                "id": "R4ZGyLQaBl-carrack",
-                "title": "Carrack",
-                "content": "The Carrack is a multi-crew explorer spacecraft manufactured by Anvil Aerospace. \n\nOriginally a military vessel for deep space exploration, the Carrack has since been adapted for civilian use. It features advanced jump drives, a medical bay, repair facilities, a drone bay, a rover bay, and a modular cargo system. \n\nThe Carrack is designed for long-duration, self-sufficient exploration missions in uncharted space. It has become the vessel of choice for pathfinders and explorers across the galaxy, with its robust construction and versatile capabilities making it ideal for venturing into the unknown.",
-                "metadata": {
-                    "Type": "Spacecraft",
-                    "Manufacturer": "Anvil Aerospace",
-                    "Role": "Exploration",
-                    "Size": "Large"
-                },
-                "tags": ["spacecraft", "anvil", "exploration", "human spacecraft"]
-            },
-            # Aegis Ships
-            "RWnZ1lGj02-sabre": {
-                "id": "RWnZ1lGj02-sabre",
-                "title": "Sabre",
-                "content": "The Sabre is a stealth fighter spacecraft manufactured by Aegis Dynamics. \n\nDesigned as a dedicated dogfighter, the Sabre combines speed, maneuverability, and firepower with a reduced cross-section and advanced stealth features. Its sleek design and powerful engines make it one of the most agile medium fighters in the UEE fleet.",
-                "metadata": {
-                    "Type": "Spacecraft",
-                    "Manufacturer": "Aegis Dynamics",
-                    "Role": "Stealth Fighter",
-                    "Size": "Medium"
-                },
-                "tags": ["spacecraft", "aegis", "stealth", "fighter", "human spacecraft"]
-            },
-            "RWwZ1lGjo2-idris-m": {
-                "id": "RWwZ1lGjo2-idris-m",
-                "title": "Idris-M",
-                "content": "The Idris-M is a military frigate manufactured by Aegis Dynamics for the United Empire of Earth Navy (UEEN). \n\nDesigned as a patrol carrier, the Idris-M is equipped with a spinal-mounted railgun, making it a formidable combat vessel. The ship can carry multiple fighters in its hangar bay, serving as a mobile base of operations for extended missions.",
-                "metadata": {
-                    "Type": "Spacecraft",
-                    "Manufacturer": "Aegis Dynamics",
-                    "Role": "Military Frigate",
-                    "Size": "Capital"
-                },
-                "tags": ["spacecraft", "aegis", "military", "capital ship", "frigate", "human spacecraft"]
-            },
-            # RSI Ships
-            "RWnZ1lGj04-constellation": {
-                "id": "RWnZ1lGj04-constellation",
-                "title": "Constellation",
-                "content": "The Constellation is a multi-role spacecraft series manufactured by Roberts Space Industries (RSI). \n\nThe Constellation line represents RSI's premier multi-crew ships, designed to be versatile platforms capable of fulfilling various roles including cargo transport, exploration, and combat.",
-                "metadata": {
-                    "Type": "Spacecraft",
-                    "Manufacturer": "Roberts Space Industries",
-                    "Role": "Multi-role",
-                    "Size": "Large"
-                },
-                "tags": ["spacecraft", "rsi", "multi-role", "human spacecraft", "constellation"]
-            },
-            "RWnZ1lGj05-andromeda": {
-                "id": "RWnZ1lGj05-andromeda",
-                "title": "Constellation Andromeda",
-                "content": "The Constellation Andromeda is the base variant of the Constellation series manufactured by Roberts Space Industries (RSI). \n\nDesigned as a multi-purpose vessel, the Andromeda balances cargo capacity with combat capability, featuring four size 4 hardpoints and a complement of missiles that make it a formidable opponent despite its size.",
-                "metadata": {
-                    "Type": "Spacecraft",
-                    "Manufacturer": "Roberts Space Industries",
-                    "Role": "Multi-role",
-                    "Size": "Large"
-                },
-                "tags": ["spacecraft", "rsi", "multi-role", "human spacecraft", "constellation", "andromeda"]
-            },
-            # Alien Species
-            "VDo8xQZlwE-banu": {
-                "id": "VDo8xQZlwE-banu",
-                "title": "Banu",
-                "content": "The Banu are a sapient species and the first alien race that Humanity made contact with. \n\nThe Banu are a trading culture with a loose government called the Banu Protectorate. They are known for their merchant skills and unique societal structure organized around trade-focused Souli (guilds).",
-                "metadata": {
-                    "Type": "Species",
-                    "Homeworld": "Unknown",
-                    "Government": "Banu Protectorate",
-                    "Diplomatic Status": "Friendly with UEE"
-                },
-                "tags": ["species", "alien", "banu protectorate", "traders"]
-            },
-            # Alien Ships
-            "RWwZ7OAj9p-banu-merchantman": {
-                "id": "RWwZ7OAj9p-banu-merchantman",
-                "title": "Banu Merchantman",
-                "content": "The Banu Merchantman is a large trading vessel and the flagship of the Banu species. \n\nKnown for its distinctive asymmetrical design, the Merchantman serves as both a mobile marketplace and a formidable defensive platform.",
-                "metadata": {
-                    "Type": "Spacecraft",
-                    "Manufacturer": "Banu",
-                    "Role": "Trading/Transport",
-                    "Size": "Large"
-                },
-                "tags": ["spacecraft", "banu", "trading", "alien spacecraft", "merchantman"]
-            }
-        }
+        """Return the read-only built-in articles for common ships and topics"""
+        return reference_data.get_reference_data().articles
     
-    def search_articles(self, query):
-        """Search for articles in the Galactapedia"""
+    def search_articles(self, query, workers=CATEGORY_WORKERS):
+        """Search for articles in the Galactapedia
+
+        `workers` caps how many category listings the index fallback fetches at once.
+        """
         print(f"Searching Galactapedia for: {query}")
         
         # Check cache first
-        if query in self.search_cache:
+        cached_results = self.search_cache.get(query)
+        if cached_results is not None:
             print("Returning cached search results")
-            return self.search_cache[query]
+            return cached_results
         
-        # First, try direct scraping of the search results page
-        try:
-            search_url = f"{self.base_url}/search?query={quote(query)}"
-            print(f"Scraping search results from: {search_url}")
-            
-            response = requests.get(search_url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Look for search results in the page
-            results = []
-            
-            # Find all search result items
-            result_items = soup.select(".search-result-item")
-            
-            for item in result_items:
-                # Extract article ID and title
-                link = item.select_one("a[href^='/galactapedia/article/']")
-                if not link:
-                    continue
-                    
-                article_id = link['href'].split('/')[-1]
-                title = link.text.strip()
-                
-                # Extract description if available
-                desc_elem = item.select_one(".search-result-description")
-                description = desc_elem.text.strip() if desc_elem else ""
-                
-                # Extract type/category if available
-                type_elem = item.select_one(".search-result-type")
-                article_type = type_elem.text.strip() if type_elem else ""
-                
-                # Calculate relevance score based on query match
-                relevance_score = 0
-                query_terms = query.lower().split()
-                title_lower = title.lower()
-                description_lower = description.lower()
-                
-                # Check for exact title match (highest priority)
-                if query.lower() == title_lower:
-                    relevance_score += 100
-                
-                # Check for title containing the full query
-                elif query.lower() in title_lower:
-                    relevance_score += 75
-                
-                # Check for all query terms in title
-                elif all(term in title_lower for term in query_terms):
-                    relevance_score += 60
-                
-                # Check for any query terms in title (partial matches)
-                else:
-                    for term in query_terms:
-                        if term in title_lower:
-                            relevance_score += 15
+        # First, try direct scraping of the search results page (offline mode only uses the mirror)
+        if not self.offline:
+            try:
+                search_url = f"{self.base_url}/search?query={quote(query)}"
+                print(f"Scraping search results from: {search_url}")
                 
-                # Check for query terms in description
-                for term in query_terms:
-                    if term in description_lower:
-                        relevance_score += 5
+                response = http_session.get(search_url, headers=self.headers, timeout=15, cache="galactapedia_search")
+                response.raise_for_status()
                 
-                # Boost score for spacecraft if looking for ships
-                ship_terms = ["ship", "spacecraft", "vessel", "fighter", "frigate", "cruiser", "carrier"]
-                if any(term in query.lower() for term in ship_terms) and article_type.lower() == "spacecraft":
-                    relevance_score += 20
+                tree = html_parser.parse_html(response.text)
                 
-                # Add the result with its relevance score
-                results.append({
-                    "id": article_id,
-                    "title": title,
-                    "description": description,
-                    "type": article_type,
-                    "url": f"{self.base_url}/article/{article_id}",
-                    "relevance_score": relevance_score
-                })
-            
-            if results:
-                # Sort results by relevance score (highest first)
-                results.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+                # Look for search results in the page
+                results = []
                 
-                # Remove the relevance_score field before returning
-                for result in results:
-                    if "relevance_score" in result:
-                        del result["relevance_score"]
+                # Find all search result items
+                result_items = tree.select(".search-result-item")
                 
-                print(f"Found {len(results)} search results from web scraping")
-                self.search_cache[query] = results
-                return results
-                
-            print("No direct search results found, trying category-based search")
-        except Exception as e:
-            print(f"Direct search scraping failed: {e}")
-        
-        # Fallback: Try the category browsing approach and filter results
-        try:
-            # Add more categories that might contain general lore
-            categories_to_check = ["spacecraft", "planets", "people", "history", "military", 
-                                   "species", "locations", "organizations", "technology"]
-            all_results = []
-            
-            for category in categories_to_check:
-                print(f"Checking category: {category}")
-                category_articles = self.get_category(category)
-                all_results.extend(category_articles)
-            
-            # Filter and score results based on query - check title and description
-            scored_results = []
-            query_terms = query.lower().split()
-            
-            for article in all_results:
-                title = article.get("title", "").lower()
-                description = article.get("description", "").lower()
-                tags = [tag.lower() for tag in article.get("tags", [])]
-                article_type = article.get("type", "").lower()
-                
-                # Calculate relevance score
-                relevance_score = 0
-                
-                # Check for exact title match (highest priority)
-                if query.lower() == title:
-                    relevance_score += 100
+                for item in result_items:
+                    # Extract article ID and title
+                    link = item.select_one("a[href^='/galactapedia/article/']")
+                    if not link:
+                        continue
+                        
+                    article_id = link['href'].split('/')[-1]
+                    title = link.text.strip()
                     
-                # Check for title containing the full query
-                elif query.lower() in title:
-                    relevance_score += 75
-                
-                # Check for all query terms in title
-                elif all(term in title for term in query_terms):
-                    relevance_score += 60
-                
-                # Check for any query terms in title (partial matches)
-                else:
-                    # Check for fuzzy matches in title (handles misspellings)
+                    # Extract description if available
+                    desc_elem = item.select_one(".search-result-description")
+                    description = desc_elem.text.strip() if desc_elem else ""
+                    
+                    # Extract type/category if available
+                    type_elem = item.select_one(".search-result-type")
+                    article_type = type_elem.text.strip() if type_elem else ""
+                    
+                    # Calculate relevance score based on query match
+                    relevance_score = 0
+                    query_terms = query.lower().split()
+                    title_lower = title.lower()
+                    description_lower = description.lower()
+                    
+                    # Check for exact title match (highest priority)
+                    if query.lower() == title_lower:
+                        relevance_score += 100
+                    
+                    # Check for title containing the full query
+                    elif query.lower() in title_lower:
+                        relevance_score += 75
+                    
+                    # Check for all query terms in title
+                    elif all(term in title_lower for term in query_terms):
+                        relevance_score += 60
+                    
+                    # Check for any query terms in title (partial matches)
+                    else:
+                        for term in query_terms:
+                            if term in title_lower:
+                                relevance_score += 15
+                    
+                    # Check for query terms in description
                     for term in query_terms:
-                        if term in title:
-                            relevance_score += 15
-                        # Check for partial matches (e.g., "conste" matching "constellation")
-                        elif len(term) > 3 and any(term[:min(len(term), i+3)] in title for i in range(len(term)-2)):
-                            relevance_score += 10
-                        # Check for character-swapped misspellings (e.g., "pheonix" vs "phoenix")
-                        elif len(term) > 4 and any(term.replace(term[i:i+2], term[i+1]+term[i], 1) in title for i in range(len(term)-1)):
-                            relevance_score += 8
-                
-                # Check for query terms in description
-                for term in query_terms:
-                    if term in description:
-                        relevance_score += 5
-                    elif len(term) > 3 and any(term[:min(len(term), i+3)] in description for i in range(len(term)-2)):
-                        relevance_score += 3
-                
-                # Check for query terms in tags
-                for term in query_terms:
-                    if any(term in tag for tag in tags):
-                        relevance_score += 10
-                
-                # Boost score for spacecraft if looking for ships
-                ship_terms = ["ship", "spacecraft", "vessel", "fighter", "frigate", "cruiser", "carrier"]
-                if any(term in query.lower() for term in ship_terms) and "spacecraft" in tags:
-                    relevance_score += 20
+                        if term in description_lower:
+                            relevance_score += 5
+                    
+                    # Boost score for spacecraft if looking for ships
+                    ship_terms = ["ship", "spacecraft", "vessel", "fighter", "frigate", "cruiser", "carrier"]
+                    if any(term in query.lower() for term in ship_terms) and article_type.lower() == "spacecraft":
+                        relevance_score += 20
+                    
+                    # Add the result with its relevance score
+                    results.append({
+                        "id": article_id,
+                        "title": title,
+                        "description": description,
+                        "type": article_type,
+                        "url": f"{self.base_url}/article/{article_id}",
+                        "relevance_score": relevance_score
+                    })
                 
-                # Only include results with some relevance
-                if relevance_score > 0:
-                    article_copy = article.copy()
-                    article_copy["relevance_score"] = relevance_score
-                    scored_results.append(article_copy)
-            
-            # Sort by relevance score
-            scored_results.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+                if results:
+                    # Sort results by relevance score (highest first)
+                    results.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+                    
+                    # Remove the relevance_score field before returning
+                    for result in results:
+                        if "relevance_score" in result:
+                            del result["relevance_score"]
+                    
+                    print(f"Found {len(results)} search results from web scraping")
+                    self.search_cache[query] = results
+                    return results
+                    
+                print("No direct search results found, trying category-based search")
+            except Exception as e:
+                print(f"Direct search scraping failed: {e}")
             
-            # Remove the relevance_score field before returning
-            filtered_results = []
-            for result in scored_results:
-                if "relevance_score" in result:
-                    del result["relevance_score"]
-                filtered_results.append(result)
+        # Fallback: Answer from the local index of category listings
+        try:
+            self.refresh_index(workers=workers)
+            filtered_results = self.get_index().search(query)
             
-            print(f"Found {len(filtered_results)} matching articles from categories")
+            print(f"Found {len(filtered_results)} matching articles in the local index")
             
             # If we found results, return them
             if filtered_results:
@@ -324,7 +202,7 @@ class GalactapediaClient:
             return []
             
         except Exception as e:
-            print(f"Category-based search failed: {e}")
+            print(f"Index-based search failed: {e}")
             
             # Try our common ship database as a last resort
             ship_results = self.get_common_ship_info(query)
@@ -335,90 +213,114 @@ class GalactapediaClient:
                 
             return []
     
-    def get_article(self, article_id):
-        """Get a specific article from the Galactapedia"""
+    def get_article(self, article_id, refresh=False, workers=CATEGORY_WORKERS):
+        """Get a specific article from the Galactapedia
+
+        With refresh, the in-memory copy is dropped and the cached article page
+        is revalidated with the server, so a changed article is read again.
+        `workers` caps how many categories are swept at once for unknown ids.
+        """
         print(f"Retrieving Galactapedia article: {article_id}")
         
         # Check cache first
-        if article_id in self.article_cache:
+        if refresh:
+            self.article_cache.delete(article_id)
+        cached_article = self.article_cache.get(article_id)
+        if cached_article is not None:
             print("Returning cached article")
-            return self.article_cache[article_id]
+            return cached_article
         
         # Check if we have hardcoded content for this article
         hardcoded_articles = self.get_hardcoded_articles()
         if article_id in hardcoded_articles:
             print(f"Using hardcoded content for {article_id}")
-            article = hardcoded_articles[article_id].copy()
+            article = reference_data.thaw(hardcoded_articles[article_id])
             article["url"] = f"{self.base_url}/article/{article_id}"
             self.article_cache[article_id] = article
             return article
         
+        if self.offline:
+            article = self.get_mirror().get_article(article_id)
+            if article is None:
+                print(f"Article {article_id} is not in the Galactapedia mirror")
+                article = {
+                    "id": article_id,
+                    "title": article_id,
+                    "url": f"{self.base_url}/article/{article_id}",
+                    "metadata": {}
+                }
+            self.article_cache[article_id] = article
+            return article
+        
         # First, check if we can find this article in our category listings
         try:
-            # Get articles from multiple categories to increase chances of finding it
-            categories_to_check = ["spacecraft", "planets", "people", "history", "military"]
-            for category in categories_to_check:
-                category_articles = self.get_category(category)
-                for article in category_articles:
-                    if article.get("id") == article_id:
-                        # Found the article in a category, add more details
-                        article_url = f"{self.base_url}/article/{article_id}"
-                        article["url"] = article_url
+            # Any category fetched before has recorded its articles in the index
+            article = self.get_index().get(article_id)
+            if article is None:
+                # Walk the likely categories concurrently, stopping once the article turns up
+                article = self._find_in_categories(article_id, ARTICLE_CATEGORIES, workers)
+            if article is not None:
+                # Found the article in a category, add more details
+                article_url = f"{self.base_url}/article/{article_id}"
+                article["url"] = article_url
+                
+                # Try to get more content from the article page
+                try:
+                    response = http_session.get(article_url, headers=self.headers, timeout=15, cache="galactapedia_article", revalidate=refresh)
+                    if response.status_code == 200:
+                        tree = html_parser.parse_html(response.text)
                         
-                        # Try to get more content from the article page
-                        try:
-                            response = requests.get(article_url, headers=self.headers, timeout=15)
-                            if response.status_code == 200:
-                                soup = BeautifulSoup(response.text, 'html.parser')
-                                
-                                # Extract article content
-                                content_elem = soup.select_one(".article-content")
-                                if content_elem:
-                                    article["content"] = content_elem.text.strip()
-                                
-                                # Extract metadata
-                                metadata = {}
-                                metadata_items = soup.select(".article-metadata-item")
-                                for item in metadata_items:
-                                    label_elem = item.select_one(".article-metadata-label")
-                                    value_elem = item.select_one(".article-metadata-value")
-                                    if label_elem and value_elem:
-                                        label = label_elem.text.strip().rstrip(":")
-                                        value = value_elem.text.strip()
-                                        metadata[label] = value
-                                
-                                if metadata:
-                                    article["metadata"] = metadata
-                        except Exception as e:
-                            print(f"Failed to get article details: {e}")
+                        # Extract article content
+                        content_elem = tree.select_one(".article-content")
+                        if content_elem:
+                            article["content"] = content_elem.text.strip()
                         
-                        self.article_cache[article_id] = article
-                        return article
+                        # Extract metadata
+                        metadata = {}
+                        metadata_items = tree.select(".article-metadata-item")
+                        for item in metadata_items:
+                            label_elem = item.select_one(".article-metadata-label")
+                            value_elem = item.select_one(".article-metadata-value")
+                            if label_elem and value_elem:
+                                label = label_elem.text.strip().rstrip(":")
+                                value = value_elem.text.strip()
+                                metadata[label] = value
+                        
+                        if metadata:
+                            article["metadata"] = metadata
+                except Exception as e:
+                    print(f"Failed to get article details: {e}")
+                
+                self._index_article(article)
+                # Without its page content the summary is only kept briefly, so the page is retried soon
+                ttl = None if "content" in article else FAILED_ARTICLE_TTL
+                self.article_cache.set(article_id, article, ttl)
+                return article
         except Exception as e:
             print(f"Category-based article lookup failed: {e}")
         
         # If we haven't found it yet, try direct access to the article page
         try:
             article_url = f"{self.base_url}/article/{article_id}"
-            response = requests.get(article_url, headers=self.headers, timeout=15)
+            response = http_session.get(article_url, headers=self.headers, timeout=15, cache="galactapedia_article", revalidate=refresh)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            tree = html_parser.parse_html(response.text)
             
             # Extract article title
-            title_elem = soup.select_one(".article-title")
+            title_elem = tree.select_one(".article-title")
             if not title_elem:
                 raise Exception("Could not find article title")
             
             title = title_elem.text.strip()
             
             # Extract article content
-            content_elem = soup.select_one(".article-content")
+            content_elem = tree.select_one(".article-content")
             content = content_elem.text.strip() if content_elem else ""
             
             # Extract metadata
             metadata = {}
-            metadata_items = soup.select(".article-metadata-item")
+            metadata_items = tree.select(".article-metadata-item")
             for item in metadata_items:
                 label_elem = item.select_one(".article-metadata-label")
                 value_elem = item.select_one(".article-metadata-value")
@@ -438,6 +340,7 @@ class GalactapediaClient:
             if metadata:
                 article["metadata"] = metadata
             
+            self._index_article(article)
             self.article_cache[article_id] = article
             return article
             
@@ -452,7 +355,8 @@ class GalactapediaClient:
                 "metadata": {}
             }
             
-            self.article_cache[article_id] = article
+            # A failed lookup is shared by every caller of the shared client, so only cache it briefly
+            self.article_cache.set(article_id, article, FAILED_ARTICLE_TTL)
             return article
     
     def get_category(self, category_name):
@@ -460,192 +364,261 @@ class GalactapediaClient:
         print(f"Retrieving Galactapedia category: {category_name}")
         
         # Check cache first
-        if category_name in self.category_cache:
-            return self.category_cache[category_name]
+        cached_articles = self.category_cache.get(category_name)
+        if cached_articles is not None:
+            return cached_articles
+        
+        if self.offline:
+            articles = self.get_mirror().get_category(category_name)
+            self.category_cache[category_name] = articles
+            self._index_category(category_name, articles)
+            return articles
         
         try:
             # Try to scrape the category page
             category_url = f"{self.base_url}/category/{category_name}"
-            response = requests.get(category_url, headers=self.headers, timeout=15)
+            response = http_session.get(category_url, headers=self.headers, timeout=15, cache="galactapedia_category")
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Find all article items
-            articles = []
-            article_items = soup.select(".category-article-item")
-            
-            for item in article_items:
-                # Extract article ID and title
-                link = item.select_one("a[href^='/galactapedia/article/']")
-                if not link:
-                    continue
-                    
-                article_id = link['href'].split('/')[-1]
-                title = link.text.strip()
-                
-                # Extract description if available
-                desc_elem = item.select_one(".category-article-description")
-                description = desc_elem.text.strip() if desc_elem else ""
-                
-                articles.append({
-                    "id": article_id,
-                    "title": title,
-                    "description": description,
-                    "url": f"{self.base_url}/article/{article_id}",
-                    "tags": [category_name]
-                })
-            
+            articles = self.parse_category_html(response.text, category_name)
             self.category_cache[category_name] = articles
+            self._index_category(category_name, articles)
             return articles
             
         except Exception as e:
             print(f"Failed to retrieve category: {e}")
             return []
     
-    def get_common_ship_info(self, query):
-        """Provide information about common ships based on the query"""
-        # Dictionary of common ships with their variants and information
-        common_ships = {
-            # RSI Constellation series
-            "constellation": {
-                "variants": ["andromeda", "aquila", "phoenix", "taurus"],
-                "title": "Constellation",
-                "manufacturer": "Roberts Space Industries",
-                "content": "The RSI Constellation is a multi-crew spacecraft that comes in several variants. It's known for its versatility and is one of the most iconic ships in the Star Citizen universe.",
-                "type": "Spacecraft",
-                "role": "Multi-purpose",
-                "size": "Large"
-            },
-            "phoenix": {
-                "parent": "constellation",
-                "title": "Constellation Phoenix",
-                "manufacturer": "Roberts Space Industries",
-                "content": "The Constellation Phoenix is the luxury variant of the RSI Constellation series. It features high-end accommodations, a private lounge, and upgraded components compared to other Constellation variants.",
-                "type": "Spacecraft",
-                "role": "Luxury/VIP Transport",
-                "size": "Large"
-            },
-            
-            # Aegis ships
-            "idris": {
-                "variants": ["idris-m", "idris-p", "idris-k"],
-                "title": "Idris",
-                "manufacturer": "Aegis Dynamics",
-                "content": "The Aegis Idris is a capital-class frigate used by the UEE Navy and private organizations. It can carry multiple smaller ships and serves as a mobile base of operations.",
-                "type": "Spacecraft",
-                "role": "Frigate",
-                "size": "Capital"
-            },
-            "sabre": {
-                "title": "Sabre",
-                "manufacturer": "Aegis Dynamics",
-                "content": "The Aegis Sabre is a stealth fighter designed for dogfighting. It features a reduced cross-section and advanced stealth features, making it difficult to detect.",
-                "type": "Spacecraft",
-                "role": "Stealth Fighter",
-                "size": "Medium"
-            },
-            
-            # Anvil ships
-            "carrack": {
-                "title": "Carrack",
-                "manufacturer": "Anvil Aerospace",
-                "content": "The Anvil Carrack is an expedition vessel designed for long-range exploration. It features advanced jump drives, a medical bay, repair facilities, and a modular cargo system.",
-                "type": "Spacecraft",
-                "role": "Exploration",
-                "size": "Large"
-            },
+    def get_index(self):
+        """Return the local search index, loading it from disk on first use"""
+        with self._index_lock:
+            if self._index is None:
+                self._index = galactapedia_index.GalactapediaIndex.load()
+            return self._index
+    
+    def refresh_index(self, categories=None, force=False, workers=CATEGORY_WORKERS):
+        """Re-fetch the categories whose index entries are older than the category TTL"""
+        if self.offline:
+            return self._refresh_offline_index(categories, force)
+        index = self.get_index()
+        ttl = response_cache.TTLS["galactapedia_category"]
+        stale = [category for category in categories or SEARCH_CATEGORIES if force or index.is_stale(category, ttl)]
+        if force:
+            for category in stale:
+                self.category_cache.delete(category)
+        for _ in self._iter_categories(stale, workers):
+            pass
+        return index
+    
+    def _refresh_offline_index(self, categories=None, force=False):
+        """Index every mirrored category (not just the search categories) with the article content stored in it"""
+        index = self.get_index()
+        mirror = self.get_mirror()
+        ttl = response_cache.TTLS["galactapedia_category"]
+        if categories is None:
+            categories = [category["id"] for category in mirror.get_categories()]
+        for category in categories:
+            if not force and not index.is_stale(category, ttl):
+                continue
+            articles = mirror.get_category(category, with_content=True)
+            index.update_category(category, articles)
+            # Content may have been synced while the listing itself stayed the same
+            for article in articles:
+                if "content" in article:
+                    index.update_article(article)
+        self.save_index()
+        return index
+    
+    def _iter_categories(self, categories, workers=CATEGORY_WORKERS):
+        """Fetch categories concurrently, yielding (category, articles) as each one completes"""
+        if not categories:
+            return
+        executor = ThreadPoolExecutor(max_workers=min(workers, len(categories)))
+        futures = {executor.submit(self.get_category, category): category for category in categories}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Skip the categories still queued if the caller stops early
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    def _find_in_categories(self, article_id, categories, workers=CATEGORY_WORKERS):
+        """Return a copy of an article's summary from the first category listing it, or None"""
+        sweep = self._iter_categories(categories, workers)
+        try:
+            for _, articles in sweep:
+                for article in articles:
+                    if article.get("id") == article_id:
+                        return dict(article)
+        finally:
+            sweep.close()
+        return None
+    
+    def get_mirror(self):
+        """Return the local Galactapedia mirror, opening it on first use"""
+        with self._index_lock:
+            if self._mirror is None:
+                self._mirror = galactapedia_mirror.GalactapediaMirror()
+            return self._mirror
+    
+    def sync_mirror(self, workers=MIRROR_WORKERS):
+        """Crawl the Galactapedia into the local mirror, fetching only new or changed articles"""
+        if self.offline:
+            print("Error: The mirror cannot be synced in offline mode")
+            return None
+        mirror = self.get_mirror()
+        categories = self.get_categories()
+        if not categories:
+            print("Could not list categories, mirroring the search categories instead")
+            categories = [{"id": name, "title": name.capitalize(), "url": f"{self.base_url}/category/{name}"}
+                          for name in SEARCH_CATEGORIES]
+        categories_by_id = {category["id"]: category for category in categories}
+        
+        # Refresh every category listing, collecting the articles that need fetching
+        stale_ids = set()
+        for category_id, articles in self._iter_categories(list(categories_by_id)):
+            if not articles:
+                # An empty listing usually means the fetch failed, so keep the previous one
+                print(f"No articles listed in category '{category_id}', keeping the mirrored listing")
+                continue
+            stale_ids.update(mirror.store_category(categories_by_id[category_id], articles))
+        
+        print(f"Fetching {len(stale_ids)} new or changed articles with {workers} workers")
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Listed as changed, so neither the in-memory nor the cached page copy can be trusted
+            for article in executor.map(lambda article_id: self.get_article(article_id, refresh=True), stale_ids):
+                # Articles whose page could not be read keep their summary and are retried next sync
+                if "content" in article:
+                    mirror.store_article(article)
+                    fetched += 1
+        
+        removed = mirror.prune()
+        self.save_index()
+        
+        stats = mirror.stats()
+        stats.update({"fetched": fetched, "failed": len(stale_ids) - fetched, "removed": removed})
+        return stats
+    
+    def save_index(self):
+        """Write the local index to disk if it has unsaved changes"""
+        index = self.get_index()
+        try:
+            if index.dirty:
+                index.save()
+        except OSError as e:
+            print(f"Failed to save Galactapedia index: {e}")
+    
+    def _index_category(self, category_name, articles):
+        """Add a freshly fetched category listing to the local index and save it"""
+        self.get_index().update_category(category_name, articles)
+        self.save_index()
+    
+    def _index_article(self, article):
+        """Add a fetched article's content to the local index (saved with the next category update)"""
+        self.get_index().update_article(article)
+    
+    def parse_category_html(self, html, category_name):
+        """Extract the article summaries listed on a category page"""
+        tree = html_parser.parse_html(html)
+        
+        # Find all article items
+        articles = []
+        article_items = tree.select(".category-article-item")
+        
+        for item in article_items:
+            # Extract article ID and title
+            link = item.select_one("a[href^='/galactapedia/article/']")
+            if not link:
+                continue
+                
+            article_id = link['href'].split('/')[-1]
+            title = link.text.strip()
             
-            # Origin ships
-            "890 jump": {
-                "title": "890 Jump",
-                "manufacturer": "Origin Jumpworks",
-                "content": "The Origin 890 Jump is a luxury touring spacecraft and the flagship of Origin's lineup. It represents the pinnacle of luxury space travel with opulent interiors and high-end amenities.",
-                "type": "Spacecraft",
-                "role": "Luxury Touring",
-                "size": "Capital"
-            },
+            # Extract description if available
+            desc_elem = item.select_one(".category-article-description")
+            description = desc_elem.text.strip() if desc_elem else ""
             
-            # Drake ships
-            "cutlass": {
-                "variants": ["black", "blue", "red"],
-                "title": "Cutlass",
-                "manufacturer": "Drake Interplanetary",
-                "content": "The Drake Cutlass is a multi-purpose ship that balances cargo capacity with combat capability. It's popular among independent operators and pirates.",
-                "type": "Spacecraft",
-                "role": "Multi-purpose",
-                "size": "Medium"
-            }
-        }
+            articles.append({
+                "id": article_id,
+                "title": title,
+                "description": description,
+                "url": f"{self.base_url}/article/{article_id}",
+                "tags": [category_name]
+            })
         
+        return articles
+    
+    def get_common_ship_info(self, query):
+        """Provide information about common ships based on the query"""
         # Normalize the query
         query_lower = query.lower()
         
+        reference = reference_data.get_reference_data()
+        ships = reference.ships
+        
         # Check for exact matches
-        if query_lower in common_ships:
-            ship_info = common_ships[query_lower]
+        if query_lower in ships:
+            ship_info = ships[query_lower]
             return self._format_ship_result(ship_info, query_lower)
         
-        # Check for variant matches (e.g., "constellation phoenix")
+        matcher = reference.ship_matcher
         query_parts = query_lower.split()
+        
+        # Check for variant matches (e.g., "constellation phoenix")
         for part in query_parts:
-            if part in common_ships:
-                ship_info = common_ships[part]
-                # Check if another part matches a variant (including fuzzy matching)
+            if part in ships:
+                ship_info = ships[part]
+                # Check if another part matches a variant (including misspelled variants)
                 for other_part in query_parts:
                     if other_part != part and 'variants' in ship_info:
-                        # Check exact variant match first
-                        if other_part in ship_info['variants']:
-                            variant_key = other_part
-                            if variant_key in common_ships:
-                                return self._format_ship_result(common_ships[variant_key], variant_key)
-                            else:
-                                # Create a variant result based on the parent ship
-                                variant_info = ship_info.copy()
-                                variant_info['title'] = f"{ship_info['title']} {other_part.capitalize()}"
-                                variant_info['content'] = f"The {variant_info['title']} is a variant of the {ship_info['title']} series by {ship_info['manufacturer']}."
-                                return self._format_ship_result(variant_info, f"{part}_{other_part}")
-                        
-                        # Check for fuzzy variant matches
-                        for variant in ship_info['variants']:
-                            if self._fuzzy_match(other_part, variant):
-                                # Found a fuzzy match for the variant
-                                if variant in common_ships:
-                                    return self._format_ship_result(common_ships[variant], variant)
-                                else:
-                                    # Create a variant result based on the parent ship
-                                    variant_info = ship_info.copy()
-                                    variant_info['title'] = f"{ship_info['title']} {variant.capitalize()}"
-                                    variant_info['content'] = f"The {variant_info['title']} is a variant of the {ship_info['title']} series by {ship_info['manufacturer']}."
-                                    return self._format_ship_result(variant_info, f"{part}_{variant}")
+                        for _, _, values in matcher.lookup(other_part):
+                            for value in values:
+                                if value[0] == "variant" and value[1] == part:
+                                    return self._format_variant_result(part, value[2])
                 
                 # Just the base ship was mentioned
                 return self._format_ship_result(ship_info, part)
         
-        # Check for fuzzy matches (handle misspellings)
-        for ship_key, ship_info in common_ships.items():
-            # Check for simple misspellings (e.g., "pheonix" instead of "phoenix")
-            if self._fuzzy_match(query_lower, ship_key):
-                return self._format_ship_result(ship_info, ship_key)
-            
-            # Check for variant misspellings
-            if 'variants' in ship_info:
-                for variant in ship_info['variants']:
-                    variant_full = f"{ship_key} {variant}"
-                    if self._fuzzy_match(query_lower, variant_full):
-                        # Check if we have specific info for this variant
-                        if variant in common_ships:
-                            return self._format_ship_result(common_ships[variant], variant)
-                        else:
-                            # Create a variant result based on the parent ship
-                            variant_info = ship_info.copy()
-                            variant_info['title'] = f"{ship_info['title']} {variant.capitalize()}"
-                            variant_info['content'] = f"The {variant_info['title']} is a variant of the {ship_info['title']} series by {ship_info['manufacturer']}."
-                            return self._format_ship_result(variant_info, f"{ship_key}_{variant}")
+        # Check for multi-word names inside the query (e.g., "890 jump luxury")
+        for i in range(len(query_parts) - 1):
+            pair = f"{query_parts[i]} {query_parts[i + 1]}"
+            if pair in ships:
+                return self._format_ship_result(ships[pair], pair)
+        
+        # Check for fuzzy matches of the whole query, then of each word (handles misspellings)
+        for candidate in [query_lower] + query_parts:
+            match = matcher.best(candidate)
+            if match is None and len(candidate) >= 3:
+                # Partial names (e.g., "cutl" for "cutlass")
+                completions = matcher.complete(candidate)
+                match = (completions[0], 0, matcher.terms[completions[0]]) if completions else None
+            if match is not None:
+                value = match[2][0]
+                if value[0] == "ship":
+                    return self._format_ship_result(ships[value[1]], value[1])
+                return self._format_variant_result(value[1], value[2])
         
         # No matches found
         return []
     
+    def _format_variant_result(self, parent_key, variant):
+        """Format a ship variant, falling back to a summary based on the parent ship"""
+        ships = reference_data.get_reference_data().ships
+        
+        # Check if we have specific info for this variant
+        if variant in ships:
+            return self._format_ship_result(ships[variant], variant)
+        
+        # Create a variant result based on the parent ship
+        ship_info = ships[parent_key]
+        variant_info = dict(ship_info)
+        variant_info['title'] = f"{ship_info['title']} {variant.capitalize()}"
+        variant_info['content'] = f"The {variant_info['title']} is a variant of the {ship_info['title']} series by {ship_info['manufacturer']}."
+        return self._format_ship_result(variant_info, f"{parent_key}_{variant}")
+    
     def _format_ship_result(self, ship_info, ship_id):
         """Format ship information into a result object"""
         result = {
@@ -668,47 +641,19 @@ class GalactapediaClient:
         
         return [result]
     
-    def _fuzzy_match(self, query, target):
-        """Simple fuzzy matching to handle common misspellings"""
-        # Exact match
-        if query == target:
-            return True
-        
-        # Check if query is contained in target
-        if query in target or target in query:
-            return True
-        
-        # Check for character swaps (e.g., "pheonix" vs "phoenix")
-        if len(query) > 4 and len(target) > 4:
-            for i in range(len(query) - 1):
-                swapped = query[:i] + query[i+1] + query[i] + query[i+2:]
-                if swapped == target or swapped in target:
-                    return True
-            
-            # Check for common typos (missing or extra letters)
-            if abs(len(query) - len(target)) <= 2:
-                # Check if removing one character from query matches target
-                for i in range(len(query)):
-                    if query[:i] + query[i+1:] == target:
-                        return True
-                
-                # Check if removing one character from target matches query
-                for i in range(len(target)):
-                    if target[:i] + target[i+1:] == query:
-                        return True
-        
-        return False
-    
     def get_categories(self):
         """Get a list of all categories in the Galactapedia"""
+        if self.offline:
+            return self.get_mirror().get_categories()
+        
         try:
-            response = requests.get(self.base_url, headers=self.headers, timeout=15)
+            response = http_session.get(self.base_url, headers=self.headers, timeout=15, cache="galactapedia_categories")
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            tree = html_parser.parse_html(response.text)
             
             categories = []
-            category_links = soup.select("a[href^='/galactapedia/category/']")
+            category_links = tree.select("a[href^='/galactapedia/category/']")
             
             for link in category_links:
                 category_id = link['href'].split('/')[-1]
@@ -726,6 +671,42 @@ class GalactapediaClient:
             print(f"Failed to retrieve categories: {e}")
             return []
 
+# Handlers for the galactapedia resources declared in module.json
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def get_shared_client():
+    """Return the GalactapediaClient shared by the handlers so its caches survive between calls"""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = GalactapediaClient()
+    return _shared_client
+
+def handle_search(params, context):
+    """Handler for galactapedia/search"""
+    query = params['query']
+    print(f"Using galactapedia_lookup.py to search for: {query}")
+    return get_shared_client().search_articles(query)
+
+def handle_article(params, context):
+    """Handler for galactapedia/article"""
+    article_id = params['articleId']
+    print(f"Using galactapedia_lookup.py to retrieve article: {article_id}")
+    return get_shared_client().get_article(article_id)
+
+def handle_category(params, context):
+    """Handler for galactapedia/category"""
+    category_name = params['categoryName']
+    print(f"Using galactapedia_lookup.py to retrieve category: {category_name}")
+    return get_shared_client().get_category(category_name)
+
+def handle_categories(params, context):
+    """Handler for galactapedia/categories"""
+    print("Using galactapedia_lookup.py to retrieve all categories")
+    return get_shared_client().get_categories()
+
 # Display functions for command-line usage
 def display_search_results(results):
     """Display search results in a formatted way"""
@@ -815,7 +796,11 @@ def display_category_articles(category_name, articles):
 
 def main():
     """Main function for command-line usage"""
-    client = GalactapediaClient()
+    # --offline answers every command from the local mirror
+    offline = "--offline" in sys.argv
+    if offline:
+        sys.argv.remove("--offline")
+    client = GalactapediaClient(offline=True if offline else None)
     
     if len(sys.argv) < 2:
         print("Usage:")
@@ -823,6 +808,9 @@ def main():
         print("  python galactapedia_lookup.py article <article_id>")
         print("  python galactapedia_lookup.py category <category_name>")
         print("  python galactapedia_lookup.py categories")
+        print("  python galactapedia_lookup.py index")
+        print("  python galactapedia_lookup.py mirror [workers]")
+        print("  python galactapedia_lookup.py --offline <command> ...")
         return
     
     command = sys.argv[1].lower()
@@ -835,6 +823,7 @@ def main():
     elif command == "article" and len(sys.argv) >= 3:
         article_id = sys.argv[2]
         article = client.get_article(article_id)
+        client.save_index()
         display_article(article)
     
     elif command == "category" and len(sys.argv) >= 3:
@@ -846,6 +835,18 @@ def main():
         categories = client.get_categories()
         display_categories(categories)
     
+    elif command == "mirror":
+        workers = int(sys.argv[2]) if len(sys.argv) >= 3 else MIRROR_WORKERS
+        stats = client.sync_mirror(workers)
+        if stats:
+            print(f"Mirrored {stats['articles']} articles ({stats['with_content']} with content) from {stats['categories']} categories: "
+                  f"{stats['fetched']} fetched, {stats['failed']} failed, {stats['removed']} removed")
+    
+    elif command == "index":
+        index = client.refresh_index(force=True)
+        stats = index.stats()
+        print(f"Indexed {stats['articles']} articles ({stats['terms']} terms) from {stats['categories']} categories")
+    
     else:
         print("Invalid command or missing arguments.")
         print("Usage:")
@@ -853,6 +854,9 @@ def main():
         print("  python galactapedia_lookup.py article <article_id>")
         print("  python galactapedia_lookup.py category <category_name>")
         print("  python galactapedia_lookup.py categories")
+        print("  python galactapedia_lookup.py index")
+        print("  python galactapedia_lookup.py mirror [workers]")
+        print("  python galactapedia_lookup.py --offline <command> ...")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,168 @@
+"""
+Galactapedia Mirror - Compact local SQLite copy of the Galactapedia for offline lookups
+
+`python galactapedia_lookup.py mirror` crawls every category and article into
+this store. Category listings are replaced on each sync, but an article is
+only re-fetched when it is new, its title or description changed, or its
+content is still missing. GalactapediaClient(offline=True) answers entirely
+from the mirror.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import response_cache
+
+MIRROR_PATH = os.path.join(response_cache.CACHE_DIR, "galactapedia_mirror.sqlite")
+
+def summary_hash(article):
+    """Hash the parts of a category listing entry that signal an article changed"""
+    return hashlib.sha1(json.dumps([article.get("title"), article.get("description")]).encode("utf-8")).hexdigest()
+
+class GalactapediaMirror:
+    """SQLite store of Galactapedia categories, their listings and full articles"""
+
+    def __init__(self, path=MIRROR_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS categories ("
+            " id TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " synced_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS category_articles ("
+            " category TEXT NOT NULL,"
+            " article_id TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " PRIMARY KEY (category, article_id));"
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " description TEXT,"
+            " url TEXT NOT NULL,"
+            " content TEXT,"
+            " metadata TEXT,"
+            " summary_hash TEXT NOT NULL,"
+            " synced_at REAL NOT NULL);"
+        )
+        self._conn.commit()
+
+    def store_category(self, category, articles):
+        """Replace a category's listing and return the ids of articles that need (re)fetching"""
+        stale_ids = []
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO categories (id, title, url, synced_at) VALUES (?, ?, ?, ?)",
+                (category["id"], category["title"], category["url"], now)
+            )
+            self._conn.execute("DELETE FROM category_articles WHERE category = ?", (category["id"],))
+
+            for position, article in enumerate(articles):
+                new_hash = summary_hash(article)
+                row = self._conn.execute(
+                    "SELECT summary_hash, content FROM articles WHERE id = ?", (article["id"],)
+                ).fetchone()
+                if row is None or row[0] != new_hash or row[1] is None:
+                    stale_ids.append(article["id"])
+                    # Drop outdated content so a failed refetch is retried on the next sync
+                    self._conn.execute(
+                        "INSERT INTO articles (id, title, description, url, summary_hash, synced_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)"
+                        " ON CONFLICT(id) DO UPDATE SET title = excluded.title, description = excluded.description,"
+                        " url = excluded.url, summary_hash = excluded.summary_hash, content = NULL, metadata = NULL",
+                        (article["id"], article["title"], article.get("description", ""), article["url"], new_hash, now)
+                    )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO category_articles (category, article_id, position) VALUES (?, ?, ?)",
+                    (category["id"], article["id"], position)
+                )
+            self._conn.commit()
+        return stale_ids
+
+    def store_article(self, article):
+        """Store the full content and metadata of a fetched article"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE articles SET content = ?, metadata = ?, synced_at = ? WHERE id = ?",
+                (article.get("content", ""), json.dumps(article.get("metadata", {})), time.time(), article["id"])
+            )
+            self._conn.commit()
+
+    def prune(self):
+        """Remove articles no longer listed in any category and return how many were removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM articles WHERE id NOT IN (SELECT article_id FROM category_articles)"
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def get_categories(self):
+        """Return every mirrored category"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, title, url FROM categories ORDER BY title").fetchall()
+        return [{"id": category_id, "title": title, "url": url} for category_id, title, url in rows]
+
+    def get_category(self, category, with_content=False):
+        """Return the article summaries listed in a category, in listing order
+
+        With with_content, articles whose content is mirrored also carry it.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.id, a.title, a.description, a.url, a.content FROM category_articles c"
+                " JOIN articles a ON a.id = c.article_id WHERE c.category = ? ORDER BY c.position",
+                (category,)
+            ).fetchall()
+        articles = []
+        for article_id, title, description, url, content in rows:
+            article = {"id": article_id, "title": title, "description": description or "", "url": url, "tags": [category]}
+            if with_content and content is not None:
+                article["content"] = content
+            articles.append(article)
+        return articles
+
+    def get_article(self, article_id):
+        """Return a mirrored article, or None if it is not in the mirror"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, description, url, content, metadata FROM articles WHERE id = ?", (article_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            categories = [category for (category,) in self._conn.execute(
+                "SELECT category FROM category_articles WHERE article_id = ? ORDER BY category", (article_id,)
+            )]
+
+        title, description, url, content, metadata = row
+        article = {"id": article_id, "title": title, "description": description or "", "url": url, "tags": categories}
+        if content is not None:
+            article["content"] = content
+        if metadata:
+            metadata = json.loads(metadata)
+            if metadata:
+                article["metadata"] = metadata
+        return article
+
+    def stats(self):
+        """Return the number of mirrored categories and articles, and how many have content"""
+        with self._lock:
+            categories = self._conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0]
+            articles, with_content = self._conn.execute(
+                "SELECT COUNT(*), COUNT(content) FROM articles"
+            ).fetchone()
+        return {"categories": categories, "articles": articles, "with_content": with_content}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,139 @@
+"""
+Handler Registry - Resolves the lookup handlers that module.json declares for each resource
+
+A resource names its handler as "module:function", for example
+"citizen_lookup:handle_profile". The module is imported with a regular import
+the first time one of its resources is called, so it is loaded once per
+process and its state (caches, sessions, clients) is shared by every call and
+by every other module that imports it.
+
+Handlers are called as handler(params, context). Required parameters declared
+in module.json have already been checked; `context` is a HandlerContext.
+Handlers raise InvalidParams for parameter values they cannot use, which the
+server reports as INVALID_PARAMS.
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+
+# Directory containing the lookup scripts handlers are imported from
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class InvalidParams(ValueError):
+    """A handler was given parameter values it cannot use"""
+
+class HandlerContext:
+    """Client-wide settings passed to every handler call"""
+
+    def __init__(self, allow_stale=False, save_results=True, processors=None, read_files=True):
+        # Serve cached profiles past their TTL immediately and refresh them in the background
+        self.allow_stale = allow_stale
+        # Also write results to <name>_profile.json style files in the working directory (off when serving)
+        self.save_results = save_results
+        # Accept *File parameters naming local files to read input from (off when serving)
+        self.read_files = read_files
+        # Callable (module, resource) -> the client's compiled responseProcessor, or None
+        self._processors = processors
+
+    def get_processor(self, module_name, resource_name):
+        """Return the responseProcessor the client compiled for a resource, or None if there is none"""
+        if self._processors is None:
+            return None
+        return self._processors(module_name, resource_name)
+
+def result_filename(name, suffix):
+    """Return the file a handler saves its result to, refusing names that would leave the working directory"""
+    if not name or any(sep in name for sep in ("/", "\\", os.sep, os.altsep) if sep):
+        raise InvalidParams(f"Refusing to save results for '{name}': it is not a plain file name")
+    return f"{name}{suffix}"
+
+def parse_spec(spec):
+    """Split a "module:function" handler spec into its two names"""
+    module_name, _, function_name = spec.partition(":")
+    if not module_name or not function_name:
+        raise ValueError(f"Invalid handler '{spec}', expected 'module:function'")
+    return module_name, function_name
+
+class HandlerRegistry:
+    """Maps (module, resource) to handler specs and imports each handler's module once"""
+
+    def __init__(self, search_path=SCRIPT_DIR):
+        self.search_path = search_path
+        self._specs = {}
+        self._handlers = {}
+        self._lock = threading.Lock()
+        # Module name -> seconds its first import took
+        self.import_times = {}
+
+    def register(self, module_name, resource_name, spec):
+        """Declare the handler for a resource without importing it"""
+        self._specs[(module_name, resource_name)] = parse_spec(spec)
+
+    def register_module(self, module_name, module):
+        """Declare the handlers of every resource in a module manifest that names one"""
+        for resource in module.get('resources', []):
+            if 'handler' in resource:
+                self.register(module_name, resource['name'], resource['handler'])
+
+    def get(self, module_name, resource_name):
+        """Return the handler for a resource, importing its module on first use"""
+        key = (module_name, resource_name)
+        handler = self._handlers.get(key)
+        if handler is not None:
+            return handler
+
+        with self._lock:
+            if key not in self._handlers:
+                script_name, function_name = self._specs[key]
+                if self.search_path not in sys.path:
+                    sys.path.insert(0, self.search_path)
+                if script_name not in sys.modules:
+                    start = time.perf_counter()
+                    importlib.import_module(script_name)
+                    self.import_times[script_name] = time.perf_counter() - start
+                self._handlers[key] = getattr(sys.modules[script_name], function_name)
+            return self._handlers[key]
+
+    def __contains__(self, key):
+        return key in self._specs
+
+def list_param(params, name, file_param, context):
+    """Collect a list parameter given inline (a list or comma-separated) and/or as a file with one item per line
+
+    Raises InvalidParams if an item is not a string, no items were given, or
+    the file cannot be read. Files are only read when context.read_files is
+    set, since a server must not read back arbitrary files for its callers.
+    """
+    items = params.get(name) or []
+    if isinstance(items, str):
+        items = items.split(',')
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        raise InvalidParams(f"Parameter '{name}' must be a list of strings or a comma-separated string")
+
+    if file_param in params:
+        if not context.read_files:
+            raise InvalidParams(f"Parameter '{file_param}' is only accepted from the command line")
+        try:
+            with open(params[file_param], 'r') as f:
+                items = list(items) + f.read().splitlines()
+        except (OSError, TypeError) as e:
+            raise InvalidParams(f"Could not read {file_param}: {e}") from e
+
+    items = [item.strip() for item in items if item.strip()]
+    if not items:
+        raise InvalidParams(f"Missing required parameter '{name}' or '{file_param}'")
+    return items
+
+def int_param(params, name, default, low, high):
+    """Read an integer parameter and clamp it to low..high, raising InvalidParams if it is not an integer"""
+    value = params.get(name, default)
+    if isinstance(value, bool):
+        raise InvalidParams(f"Parameter '{name}' must be an integer")
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise InvalidParams(f"Parameter '{name}' must be an integer") from None
+    return max(low, min(value, high))
@@ -0,0 +1,169 @@
+"""
+HTML Parser - Parsing layer that picks the fastest available HTML backend
+
+Supported backends, fastest first:
+- selectolax: the lexbor engine via selectolax (`pip install selectolax`)
+- lxml: BeautifulSoup with the lxml tree builder (`pip install lxml`)
+- html.parser: BeautifulSoup with Python's built-in parser (always available)
+
+parse_html() returns a tree whose nodes support the small part of the
+BeautifulSoup API the extractors use: select_one(), select(), .text,
+has_attr(), get(), [attribute] and decode_contents(). The backend can be
+forced with the SCTOOLS_HTML_PARSER environment variable or set_backend().
+
+parse_html(markup, only_classes=[...]) builds a tree for just the elements
+carrying one of the given classes (and their descendants). With the
+BeautifulSoup backends this skips building nodes for navigation, footers and
+scripts; lexbor parses whole documents faster than it could filter them, so
+selectolax always builds the full tree.
+"""
+
+import importlib.util
+import os
+
+BACKENDS = ("selectolax", "lxml", "html.parser")
+
+_backend = None
+
+def _is_available(backend):
+    """Check whether a backend's dependencies are installed, without importing them"""
+    if backend == "selectolax":
+        required = ("selectolax.lexbor",)
+    elif backend == "lxml":
+        required = ("lxml", "bs4")
+    elif backend == "html.parser":
+        required = ("bs4",)
+    else:
+        return False
+    try:
+        # find_spec imports parent packages (e.g. selectolax for selectolax.lexbor) but not the module itself
+        return all(importlib.util.find_spec(name) is not None for name in required)
+    except ImportError:
+        return False
+
+def available_backends():
+    """Return the installed backends, fastest first"""
+    return [backend for backend in BACKENDS if _is_available(backend)]
+
+def get_backend():
+    """Return the backend used when none is given explicitly"""
+    global _backend
+    if _backend is None:
+        requested = os.environ.get("SCTOOLS_HTML_PARSER")
+        if requested and _is_available(requested):
+            _backend = requested
+        else:
+            if requested:
+                print(f"HTML parser '{requested}' is not available, falling back")
+            _backend = available_backends()[0]
+    return _backend
+
+def set_backend(backend):
+    """Force a specific backend for subsequent parses"""
+    global _backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend '{backend}'")
+    if not _is_available(backend):
+        raise ValueError(f"HTML parser backend '{backend}' is not installed")
+    _backend = backend
+
+def _class_strainer(only_classes):
+    """Build a SoupStrainer keeping elements that carry any of the given classes"""
+    from bs4 import SoupStrainer
+    wanted = frozenset(only_classes)
+
+    def has_wanted_class(value):
+        # Depending on the bs4 version this sees the whole class string or one class at a time
+        return value is not None and not wanted.isdisjoint(value.split())
+
+    return SoupStrainer(attrs={"class": has_wanted_class})
+
+def parse_html(markup, backend=None, only_classes=None):
+    """Parse an HTML document with the given (or default) backend"""
+    backend = backend or get_backend()
+    if backend == "selectolax":
+        from selectolax.lexbor import LexborHTMLParser
+        return LexborNode(LexborHTMLParser(markup).root)
+
+    from bs4 import BeautifulSoup
+    parse_only = _class_strainer(only_classes) if only_classes else None
+    return BeautifulSoup(markup, backend, parse_only=parse_only)
+
+class Selector:
+    """A CSS selector compiled once and usable on trees from any backend"""
+
+    def __init__(self, css):
+        # The legacy :contains() pseudo-class is spelled differently by each engine
+        self.css = css
+        self._soup_css = css.replace(":contains(", ":-soup-contains(")
+        self._lexbor_css = css.replace(":contains(", ":lexbor-contains(")
+        self._compiled = None
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            import soupsieve
+            self._compiled = soupsieve.compile(self._soup_css)
+        return self._compiled
+
+    def select_one(self, node):
+        """Return the first match under node, or None"""
+        if isinstance(node, LexborNode):
+            return node.select_one(self._lexbor_css)
+        return self.compiled.select_one(node)
+
+    def select(self, node):
+        """Return every match under node"""
+        if isinstance(node, LexborNode):
+            return node.select(self._lexbor_css)
+        return self.compiled.select(node)
+
+class LexborNode:
+    """Wraps a selectolax node with the BeautifulSoup methods the extractors rely on"""
+
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def name(self):
+        return self.node.tag
+
+    @property
+    def text(self):
+        return self.node.text(deep=True)
+
+    def select_one(self, css):
+        match = self.node.css_first(css)
+        return LexborNode(match) if match is not None else None
+
+    def select(self, css):
+        return [LexborNode(match) for match in self.node.css(css)]
+
+    def has_attr(self, name):
+        return name in self.node.attributes
+
+    def get(self, name, default=None):
+        if not self.has_attr(name):
+            return default
+        return self[name]
+
+    def __getitem__(self, name):
+        attributes = self.node.attributes
+        if name not in attributes:
+            raise KeyError(name)
+        value = attributes[name] or ""
+        # Match BeautifulSoup, which splits class into a list
+        if name == "class":
+            return value.split()
+        return value
+
+    def decode_contents(self):
+        inner_html = getattr(self.node, "inner_html", None)
+        if inner_html is not None:
+            return inner_html
+        return "".join(child.html for child in self.node.iter(include_text=True))
+
+    def __bool__(self):
+        return True
@@ -0,0 +1,170 @@
+"""
+HTTP Session - Shared pooled transport used by all RSI and wiki lookups
+
+Every lookup goes through one requests.Session so TCP and TLS connections to
+robertsspaceindustries.com and starcitizen.tools are kept alive and reused
+instead of being re-established for each request. Requests are paced per
+host by rate_limit, which also retries throttled (429/503) responses.
+"""
+
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import response_cache
+import rate_limit
+import startup_profile
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+# Headers sent with every request (callers can still pass extra headers per request)
+DEFAULT_HEADERS = {
+    "User-Agent": USER_AGENT
+}
+
+# Number of per-host pools to keep and the number of keep-alive connections per host
+POOL_CONNECTIONS = int(os.environ.get("SCTOOLS_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.environ.get("SCTOOLS_POOL_MAXSIZE", "16"))
+
+# Hosts that get a dedicated adapter, sized to the effective pool size
+POOLED_HOSTS = (
+    "https://robertsspaceindustries.com",
+    "https://starcitizen.tools"
+)
+
+# Optional per-host overrides of the connection pool size
+HOST_POOL_SIZES = {}
+
+_session = None
+_session_lock = threading.Lock()
+
+def _host_pool_sizes(pool_maxsize, overrides):
+    """Size every pooled host to pool_maxsize unless an override names it"""
+    sizes = {prefix: pool_maxsize for prefix in POOLED_HOSTS}
+    sizes.update(overrides)
+    return sizes
+
+def _build_session(pool_connections, pool_maxsize, host_pool_sizes, headers):
+    """Create a session with keep-alive adapters mounted for each known host"""
+    session = requests.Session()
+    session.headers.update(headers)
+
+    default_adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+
+    for prefix, size in host_pool_sizes.items():
+        session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=size))
+
+    return session
+
+def configure(pool_connections=None, pool_maxsize=None, host_pool_sizes=None, headers=None):
+    """Replace the shared session with one using the given pool sizes and headers
+
+    Known hosts use `pool_maxsize` unless `host_pool_sizes` is passed, in which
+    case it replaces the per-host sizes entirely.
+    """
+    global _session
+    pool_maxsize = pool_maxsize or POOL_MAXSIZE
+    if host_pool_sizes is None:
+        host_pool_sizes = _host_pool_sizes(pool_maxsize, HOST_POOL_SIZES)
+    with _session_lock:
+        old_session = _session
+        _session = _build_session(
+            pool_connections or POOL_CONNECTIONS,
+            pool_maxsize,
+            host_pool_sizes,
+            dict(DEFAULT_HEADERS, **(headers or {}))
+        )
+    if old_session is not None:
+        old_session.close()
+    return _session
+
+def get_session():
+    """Return the shared session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(
+                    POOL_CONNECTIONS, POOL_MAXSIZE, _host_pool_sizes(POOL_MAXSIZE, HOST_POOL_SIZES), DEFAULT_HEADERS
+                )
+    return _session
+
+# Failures after which an idempotent request is sent again
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+def request(method, url, cache=None, deadline=None, revalidate=False, **kwargs):
+    """Send a request through the shared session
+
+    When `cache` names a resource in response_cache.TTLS, fresh responses are
+    served from the persistent cache and stale ones are revalidated with the
+    stored ETag / Last-Modified validators; `revalidate` revalidates a cached
+    response even while it is fresh. Requests that reach the network
+    wait for their host's rate limiter and are retried when throttled, for at
+    most `deadline` seconds (rate_limit.DEFAULT_DEADLINE by default).
+    """
+    if cache is None or not response_cache.CACHE_ENABLED:
+        return _send(method, url, deadline, **kwargs)
+    return _cached_request(method, url, response_cache.TTLS[cache], deadline, revalidate, **kwargs)
+
+def _send(method, url, deadline, **kwargs):
+    """Send one request over the network, paced and retried by rate_limit"""
+    session = get_session()
+
+    def send_once():
+        started = time.time()
+        response = session.request(method, url, **kwargs)
+        startup_profile.record_response(started, response)
+        return response
+
+    try:
+        return rate_limit.send(method, url, send_once, deadline=deadline, retry_exceptions=RETRY_EXCEPTIONS)
+    except rate_limit.DeadlineExceeded as e:
+        # Surface as a requests timeout so callers' existing error handling applies
+        raise requests.exceptions.Timeout(str(e)) from e
+
+def _cached_request(method, url, ttl, deadline, revalidate=False, **kwargs):
+    """Serve a request from the persistent cache, revalidating stale entries"""
+    store = response_cache.get_cache()
+    key = response_cache.normalize_key(method, url, kwargs.get("params"), kwargs.get("json"))
+
+    entry = store.lookup(key)
+    if entry is not None:
+        cached, stored_at = entry
+        if not revalidate and time.time() - stored_at < ttl:
+            return cached
+
+        # Ask the server whether our copy is still current
+        headers = dict(kwargs.pop("headers", None) or {})
+        if "ETag" in cached.headers:
+            headers["If-None-Match"] = cached.headers["ETag"]
+        if "Last-Modified" in cached.headers:
+            headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+        kwargs["headers"] = headers
+
+    response = _send(method, url, deadline, **kwargs)
+
+    if response.status_code == 304 and entry is not None:
+        store.touch(key)
+        return entry[0]
+    if response.status_code == 200:
+        store.store(key, response)
+    return response
+
+def get(url, **kwargs):
+    """Send a GET request through the shared session"""
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    """Send a POST request through the shared session"""
+    return request("POST", url, **kwargs)
+
+def close():
+    """Close all pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,281 @@
+"""
+MCP Server - Runs an MCPClient as a long-running process so manifests and lookup scripts stay loaded
+
+Two transports are supported, both speaking JSON-RPC 2.0:
+- stdio: one JSON request per line on stdin, one JSON response per line on stdout
+- http: JSON-RPC requests POSTed to a local HTTP listener
+
+Streamed resources (such as citizens/profiles_batch) are collected into a list
+for JSON-RPC responses. Over HTTP they can instead be POSTed to /stream, which
+writes each item back as a line of NDJSON as soon as it is ready.
+"""
+
+import itertools
+import json
+import sys
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import handler_registry
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+def describe_modules(client):
+    """Return the modules known to the client as plain data"""
+    return [
+        {"name": name, "description": module.get('description', '')}
+        for name, module in client.modules.items()
+    ]
+
+def describe_resources(client, module_name):
+    """Return the resources of a module as plain data"""
+    module = client.modules[module_name]
+    return [
+        {
+            "name": resource['name'],
+            "description": resource.get('description', ''),
+            "method": resource.get('method', 'GET'),
+            "path": resource.get('path', '/'),
+            "parameters": resource.get('parameters', []),
+            "requiredOneOf": resource.get('requiredOneOf', [])
+        }
+        for resource in module.get('resources', [])
+    ]
+
+def validate_call(client, module_name, resource_name, resource_params):
+    """Return why a resource call is invalid, or None if it can be dispatched"""
+    if not isinstance(resource_params, dict):
+        return "Resource params must be an object"
+    if module_name not in client.modules:
+        return f"Module '{module_name}' not found"
+    resource = client.find_resource(module_name, resource_name)
+    if resource is None:
+        return f"Resource '{resource_name}' not found in module '{module_name}'"
+    missing = client.missing_parameters(resource, resource_params)
+    if missing:
+        return f"Missing required parameters: {', '.join(missing)}"
+    return None
+
+def _error(request_id, code, message):
+    """Build a JSON-RPC error response"""
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+def handle_request(client, request):
+    """Dispatch a single decoded JSON-RPC request and return the response object
+
+    Notifications (requests without an id) are still run, but None is returned
+    since they get no response.
+    """
+    if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+        return _error(None, INVALID_REQUEST, "Invalid request")
+
+    response = _respond(client, request)
+    return response if 'id' in request else None
+
+def _respond(client, request):
+    request_id = request.get('id')
+    method = request['method']
+    params = request.get('params') or {}
+    if not isinstance(params, dict):
+        return _error(request_id, INVALID_PARAMS, "Params must be an object")
+
+    try:
+        if method == 'list_modules':
+            result = describe_modules(client)
+
+        elif method == 'list_resources':
+            module_name = params.get('module')
+            if module_name not in client.modules:
+                return _error(request_id, INVALID_PARAMS, f"Module '{module_name}' not found")
+            result = describe_resources(client, module_name)
+
+        elif method == 'call_resource':
+            if 'module' not in params or 'resource' not in params:
+                return _error(request_id, INVALID_PARAMS, "Missing required parameters 'module' and 'resource'")
+            module_name, resource_name = params['module'], params['resource']
+            resource_params = params.get('params') or {}
+            invalid = validate_call(client, module_name, resource_name, resource_params)
+            if invalid:
+                return _error(request_id, INVALID_PARAMS, invalid)
+
+            result = client.call_resource(module_name, resource_name, resource_params)
+            if isinstance(result, types.GeneratorType):
+                result = list(result)
+            # Lookup scripts report failures such as a profile that was not found by printing and returning None
+            if result is None:
+                return _error(request_id, INTERNAL_ERROR, f"{module_name}/{resource_name} returned no result")
+
+        else:
+            return _error(request_id, METHOD_NOT_FOUND, f"Method '{method}' not found")
+
+    except handler_registry.InvalidParams as e:
+        return _error(request_id, INVALID_PARAMS, str(e))
+    except Exception as e:
+        print(f"Error handling {method}: {e}", file=sys.stderr)
+        return _error(request_id, INTERNAL_ERROR, str(e))
+
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+def handle_payload(client, payload):
+    """Decode a raw JSON-RPC payload (single or batch) and return the encoded response
+
+    Returns None when there is nothing to send back, i.e. the payload held only notifications.
+    """
+    try:
+        request = json.loads(payload)
+    except json.JSONDecodeError as e:
+        return json.dumps(_error(None, PARSE_ERROR, f"Parse error: {e}"))
+
+    if isinstance(request, list):
+        if not request:
+            return json.dumps(_error(None, INVALID_REQUEST, "Empty batch"))
+        responses = [response for response in (handle_request(client, item) for item in request) if response is not None]
+        return json.dumps(responses) if responses else None
+    response = handle_request(client, request)
+    return json.dumps(response) if response is not None else None
+
+def serve_stdio(client, workers=8):
+    """Serve JSON-RPC requests read line by line from stdin"""
+    # Lookup scripts report progress with print(), so keep stdout for protocol messages only
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    write_lock = threading.Lock()
+
+    def respond(line):
+        response = handle_payload(client, line)
+        if response is None:
+            return
+        with write_lock:
+            protocol_out.write(response + "\n")
+            protocol_out.flush()
+
+    print(f"Serving {client.server_config['name']} over stdio with {workers} workers", file=sys.stderr)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for line in sys.stdin:
+            line = line.strip()
+            if line:
+                executor.submit(respond, line)
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler that accepts JSON-RPC requests on POST / and NDJSON streams on POST /stream"""
+    protocol_version = "HTTP/1.1"
+    client = None
+    slots = None
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, json.dumps({"status": "ok"}))
+        else:
+            self._send_json(404, json.dumps({"error": "Not found"}))
+
+    def do_POST(self):
+        try:
+            length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            length = -1
+        if length < 0:
+            # The body cannot be delimited, so the connection cannot be reused either
+            self.close_connection = True
+            self._send_json(400, json.dumps({"error": "Missing or invalid Content-Length"}))
+            return
+        payload = self.rfile.read(length).decode('utf-8')
+
+        if self.path == '/stream':
+            self._stream(payload)
+        elif self.path in ('/', '/rpc'):
+            with self.slots:
+                response = handle_payload(self.client, payload)
+            if response is None:
+                self.send_response(204)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            else:
+                self._send_json(200, response)
+        else:
+            self._send_json(404, json.dumps({"error": "Not found"}))
+
+    def _stream(self, payload):
+        """Call a resource and write its items back as chunked NDJSON"""
+        try:
+            request = json.loads(payload)
+        except json.JSONDecodeError as e:
+            self._send_json(400, json.dumps({"error": f"Parse error: {e}"}))
+            return
+        if not isinstance(request, dict) or 'module' not in request or 'resource' not in request:
+            self._send_json(400, json.dumps({"error": "Missing required fields 'module' and 'resource'"}))
+            return
+        params = request.get('params') or {}
+        invalid = validate_call(self.client, request['module'], request['resource'], params)
+        if invalid:
+            self._send_json(400, json.dumps({"error": invalid}))
+            return
+
+        with self.slots:
+            try:
+                result = self.client.call_resource(request['module'], request['resource'], params)
+                stream = result if isinstance(result, types.GeneratorType) else None
+                if stream is not None:
+                    # A stream that fails before its first item is reported before any headers are sent
+                    first = list(itertools.islice(stream, 1))
+            except handler_registry.InvalidParams as e:
+                self._send_json(400, json.dumps({"error": str(e)}))
+                return
+            except Exception as e:
+                print(f"Error handling stream: {e}", file=sys.stderr)
+                self._send_json(500, json.dumps({"error": str(e)}))
+                return
+            if result is None:
+                self._send_json(404, json.dumps({"error": "Resource call failed"}))
+                return
+            if stream is not None:
+                items = itertools.chain(first, stream)
+            else:
+                items = result if isinstance(result, list) else [result]
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for item in items:
+                    line = (json.dumps(item) + "\n").encode('utf-8')
+                    self.wfile.write(f"{len(line):X}\r\n".encode('ascii') + line + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+            finally:
+                if stream is not None:
+                    stream.close()
+
+    def _send_json(self, status, body):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Access logs go to stderr like the rest of the diagnostics
+        print(f"{self.address_string()} - {format % args}", file=sys.stderr)
+
+def serve_http(client, host='127.0.0.1', port=8765, workers=8):
+    """Serve JSON-RPC requests over a local HTTP listener"""
+    handler = type('MCPRequestHandler', (_RequestHandler,), {
+        "client": client,
+        "slots": threading.BoundedSemaphore(workers)
+    })
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    print(f"Serving {client.server_config['name']} on http://{host}:{port}/ with {workers} workers", file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
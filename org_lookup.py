@@ -3,215 +3,360 @@ Organization Lookup Example - Demonstrates how to retrieve organization informat
 """
 
 import requests
+import http_session
 import json
 import sys
+import os
 import re
 import textwrap
-from bs4 import BeautifulSoup
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import handler_registry
+import html_parser
+import response_cache
+from stale_cache import StaleWhileRevalidateCache
 
-def get_organization_profile(sid):
-    """Retrieve an organization's profile from the RSI website"""
-    print(f"Looking up organization profile for: {sid}")
+# Member lists are paged through the RSI org members API
+MEMBERS_API_URL = "https://robertsspaceindustries.com/api/orgs/getOrgMembers"
+MEMBERS_PAGE_SIZE = 32
+
+# Parsed organization profiles are kept in memory so repeated lookups skip fetching and parsing.
+# Past their TTL they can still be served while a background refresh runs (see get_organization_profile)
+PROFILE_CACHE_ENTRIES = 1024
+PROFILE_CACHE_BYTES = 32 * 1024 * 1024
+profile_cache = StaleWhileRevalidateCache(
+    response_cache.TTLS["org_profile"], response_cache.HARD_TTLS["org_profile"],
+    max_entries=PROFILE_CACHE_ENTRIES, max_bytes=PROFILE_CACHE_BYTES
+)
+
+# Whether stale profiles are served when the caller does not say (`client.py serve` always allows them)
+ALLOW_STALE = os.environ.get("SCTOOLS_ALLOW_STALE", "") in ("1", "true", "yes")
+
+def parse_organization_profile(html):
+    """Extract an organization's profile from the HTML of its RSI page"""
+    tree = html_parser.parse_html(html)
+    org_data = {}
+    
+    # Extract organization name and SID
+    name_elem = tree.select_one("#organization h1")
+    if name_elem:
+        full_name = name_elem.text.strip()
+        org_data["name"] = re.sub(r'\s*/\s*.*$', '', full_name)  # Remove SID part
+        
+        # Extract SID
+        sid_elem = name_elem.select_one(".symbol")
+        if sid_elem:
+            org_data["sid"] = sid_elem.text.strip()
+    
+    # Extract logo
+    logo_elem = tree.select_one(".logo img")
+    if logo_elem and logo_elem.has_attr('src'):
+        logo_src = logo_elem['src']
+        # Make sure it's a full URL
+        if logo_src.startswith('/'):
+            logo_src = f"https://robertsspaceindustries.com{logo_src}"
+        org_data["logo"] = logo_src
+    
+    # Extract banner
+    banner_elem = tree.select_one(".banner img")
+    if banner_elem and banner_elem.has_attr('src'):
+        banner_src = banner_elem['src']
+        # Make sure it's a full URL
+        if banner_src.startswith('/'):
+            banner_src = f"https://robertsspaceindustries.com{banner_src}"
+        org_data["banner"] = banner_src
+    
+    # Extract background image
+    bg_elem = tree.select_one("#post-background")
+    if bg_elem and bg_elem.has_attr('style'):
+        style = bg_elem['style']
+        bg_match = re.search(r"url\('([^']+)'\)", style)
+        if bg_match:
+            bg_src = bg_match.group(1)
+            # Make sure it's a full URL
+            if bg_src.startswith('/'):
+                bg_src = f"https://robertsspaceindustries.com{bg_src}"
+            org_data["background"] = bg_src
+    
+    # Extract member count
+    count_elem = tree.select_one(".logo .count")
+    if count_elem:
+        org_data["memberCount"] = count_elem.text.strip()
+    
+    # Extract organization model
+    model_elem = tree.select_one(".tags .model")
+    if model_elem:
+        org_data["model"] = model_elem.text.strip()
     
+    # Extract commitment level
+    commitment_elem = tree.select_one(".tags .commitment")
+    if commitment_elem:
+        org_data["commitment"] = commitment_elem.text.strip()
+    
+    # Extract roleplay status
+    roleplay_elem = tree.select_one(".tags .roleplay")
+    if roleplay_elem:
+        org_data["roleplay"] = roleplay_elem.text.strip()
+    
+    # Extract primary focus
+    primary_focus_elem = tree.select_one(".focus .primary img")
+    if primary_focus_elem and primary_focus_elem.has_attr('alt'):
+        org_data["primaryFocus"] = primary_focus_elem['alt']
+    
+    # Extract secondary focus
+    secondary_focus_elem = tree.select_one(".focus .secondary img")
+    if secondary_focus_elem and secondary_focus_elem.has_attr('alt'):
+        org_data["secondaryFocus"] = secondary_focus_elem['alt']
+    
+    # Extract short description
+    desc_elem = tree.select_one(".join-us .body")
+    if desc_elem:
+        org_data["description"] = desc_elem.text.strip()
+    
+    # Extract history
+    history_elem = tree.select_one("#tab-history .markitup-text")
+    if history_elem:
+        org_data["history"] = history_elem.text.strip()
+    
+    # Extract manifesto
+    manifesto_elem = tree.select_one("#tab-manifesto .markitup-text")
+    if manifesto_elem:
+        org_data["manifesto"] = manifesto_elem.text.strip()
+    
+    # Extract charter
+    charter_elem = tree.select_one("#tab-charter .markitup-text")
+    if charter_elem:
+        org_data["charter"] = charter_elem.text.strip()
+    
+    # Extract cover image
+    cover_elem = tree.select_one(".content.block.cover img")
+    if cover_elem and cover_elem.has_attr('src'):
+        cover_src = cover_elem['src']
+        # Make sure it's a full URL
+        if cover_src.startswith('/'):
+            cover_src = f"https://robertsspaceindustries.com{cover_src}"
+        org_data["cover"] = cover_src
+    
+    return org_data
+
+def _fetch_organization_profile(sid):
+    """Fetch and parse an organization's profile, or return None if it could not be retrieved"""
     url = f"https://robertsspaceindustries.com/en/orgs/{sid}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
     
     try:
-        response = requests.get(url, headers=headers, timeout=15)
+        response = http_session.get(url, timeout=15, cache="org_profile")
         response.raise_for_status()
         
         # Parse the HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-        org_data = {}
-        
-        # Extract organization name and SID
-        name_elem = soup.select_one("#organization h1")
-        if name_elem:
-            full_name = name_elem.text.strip()
-            org_data["name"] = re.sub(r'\s*/\s*.*$', '', full_name)  # Remove SID part
-            
-            # Extract SID
-            sid_elem = name_elem.select_one(".symbol")
-            if sid_elem:
-                org_data["sid"] = sid_elem.text.strip()
-        
-        # Extract logo
-        logo_elem = soup.select_one(".logo img")
-        if logo_elem and logo_elem.has_attr('src'):
-            logo_src = logo_elem['src']
-            # Make sure it's a full URL
-            if logo_src.startswith('/'):
-                logo_src = f"https://robertsspaceindustries.com{logo_src}"
-            org_data["logo"] = logo_src
-        
-        # Extract banner
-        banner_elem = soup.select_one(".banner img")
-        if banner_elem and banner_elem.has_attr('src'):
-            banner_src = banner_elem['src']
-            # Make sure it's a full URL
-            if banner_src.startswith('/'):
-                banner_src = f"https://robertsspaceindustries.com{banner_src}"
-            org_data["banner"] = banner_src
-        
-        # Extract background image
-        bg_elem = soup.select_one("#post-background")
-        if bg_elem and bg_elem.has_attr('style'):
-            style = bg_elem['style']
-            bg_match = re.search(r"url\('([^']+)'\)", style)
-            if bg_match:
-                bg_src = bg_match.group(1)
-                # Make sure it's a full URL
-                if bg_src.startswith('/'):
-                    bg_src = f"https://robertsspaceindustries.com{bg_src}"
-                org_data["background"] = bg_src
-        
-        # Extract member count
-        count_elem = soup.select_one(".logo .count")
-        if count_elem:
-            org_data["memberCount"] = count_elem.text.strip()
-        
-        # Extract organization model
-        model_elem = soup.select_one(".tags .model")
-        if model_elem:
-            org_data["model"] = model_elem.text.strip()
-        
-        # Extract commitment level
-        commitment_elem = soup.select_one(".tags .commitment")
-        if commitment_elem:
-            org_data["commitment"] = commitment_elem.text.strip()
-        
-        # Extract roleplay status
-        roleplay_elem = soup.select_one(".tags .roleplay")
-        if roleplay_elem:
-            org_data["roleplay"] = roleplay_elem.text.strip()
-        
-        # Extract primary focus
-        primary_focus_elem = soup.select_one(".focus .primary img")
-        if primary_focus_elem and primary_focus_elem.has_attr('alt'):
-            org_data["primaryFocus"] = primary_focus_elem['alt']
-        
-        # Extract secondary focus
-        secondary_focus_elem = soup.select_one(".focus .secondary img")
-        if secondary_focus_elem and secondary_focus_elem.has_attr('alt'):
-            org_data["secondaryFocus"] = secondary_focus_elem['alt']
-        
-        # Extract short description
-        desc_elem = soup.select_one(".join-us .body")
-        if desc_elem:
-            org_data["description"] = desc_elem.text.strip()
-        
-        # Extract history
-        history_elem = soup.select_one("#tab-history .markitup-text")
-        if history_elem:
-            org_data["history"] = history_elem.text.strip()
-        
-        # Extract manifesto
-        manifesto_elem = soup.select_one("#tab-manifesto .markitup-text")
-        if manifesto_elem:
-            org_data["manifesto"] = manifesto_elem.text.strip()
-        
-        # Extract charter
-        charter_elem = soup.select_one("#tab-charter .markitup-text")
-        if charter_elem:
-            org_data["charter"] = charter_elem.text.strip()
-        
-        # Extract cover image
-        cover_elem = soup.select_one(".content.block.cover img")
-        if cover_elem and cover_elem.has_attr('src'):
-            cover_src = cover_elem['src']
-            # Make sure it's a full URL
-            if cover_src.startswith('/'):
-                cover_src = f"https://robertsspaceindustries.com{cover_src}"
-            org_data["cover"] = cover_src
-        
-        return org_data
+        return parse_organization_profile(response.text)
         
     except requests.exceptions.RequestException as e:
         print(f"Error retrieving organization profile: {e}")
         return None
 
-def get_organization_members(sid):
-    """Retrieve an organization's members list from the RSI website"""
+def get_organization_profile(sid, allow_stale=None):
+    """Retrieve an organization's profile from the RSI website
+    
+    With allow_stale, a cached profile past its TTL (but within its hard TTL)
+    is returned immediately and refreshed in the background.
+    """
+    print(f"Looking up organization profile for: {sid}")
+    
+    if allow_stale is None:
+        allow_stale = ALLOW_STALE
+    
+    # SIDs are case-insensitive on the RSI website
+    cache_key = sid.upper()
+    return profile_cache.get(cache_key, lambda: _fetch_organization_profile(sid), allow_stale)
+
+def _parse_member_item(item):
+    """Extract a member's details from a single .member-item element"""
+    member_data = {}
+    
+    # Extract handle - try multiple possible selectors
+    handle_elem = None
+    
+    # Try different possible selectors for the handle
+    handle_selectors = [
+        ".nick .value",                # Original selector
+        ".member-info .nick",          # Alternative selector
+        ".member-info a",              # Direct link to member profile
+        "a.membercard-profile",        # Another possible link format
+        ".name",                       # Simple name class
+        "h3"                           # Generic heading that might contain the name
+    ]
+    
+    for selector in handle_selectors:
+        handle_elem = item.select_one(selector)
+        if handle_elem and handle_elem.text.strip():
+            member_data["handle"] = handle_elem.text.strip()
+            break
+    
+    # If we still don't have a handle, try to extract it from href attribute
+    if "handle" not in member_data:
+        link_elem = item.select_one("a[href*='/citizens/']")
+        if link_elem and link_elem.has_attr('href'):
+            # Extract handle from URL path
+            href = link_elem['href']
+            handle_match = re.search(r'/citizens/([^/]+)', href)
+            if handle_match:
+                member_data["handle"] = handle_match.group(1)
+    
+    # Extract rank
+    rank_elem = item.select_one(".rank .value") or item.select_one(".member-rank")
+    if rank_elem:
+        member_data["rank"] = rank_elem.text.strip()
+    
+    # Extract stars (rank level)
+    stars_elem = item.select_one(".stars")
+    if stars_elem and stars_elem.has_attr('class'):
+        stars_class = ' '.join(stars_elem['class'])
+        stars_match = re.search(r'stars-(\d+)', stars_class)
+        if stars_match:
+            member_data["stars"] = int(stars_match.group(1))
+    
+    # Extract avatar
+    avatar_elem = item.select_one(".thumb img") or item.select_one(".member-thumb img")
+    if avatar_elem and avatar_elem.has_attr('src'):
+        avatar_src = avatar_elem['src']
+        # Make sure it's a full URL
+        if avatar_src.startswith('/'):
+            avatar_src = f"https://robertsspaceindustries.com{avatar_src}"
+        member_data["avatar"] = avatar_src
+    
+    return member_data
+
+def parse_members_html(html):
+    """Extract every member from an HTML fragment of .member-item elements"""
+    tree = html_parser.parse_html(html)
+    return [_parse_member_item(item) for item in tree.select(".member-item")]
+
+def _fetch_members_page(sid, page):
+    """Fetch one page of an organization's members and return (total_rows, members)"""
+    response = http_session.post(
+        MEMBERS_API_URL,
+        json={"symbol": sid, "search": "", "pagesize": MEMBERS_PAGE_SIZE, "page": page},
+        timeout=15,
+        cache="org_members"
+    )
+    response.raise_for_status()
+    payload = response.json()
+    
+    if not payload.get("success") or "data" not in payload:
+        raise requests.exceptions.RequestException(f"Unexpected members response: {payload.get('msg', 'no data')}")
+    
+    data = payload["data"]
+    members = parse_members_html(data.get("html", ""))
+    return int(data.get("totalrows", 0)), members
+
+def iter_organization_members(sid, workers=4):
+    """Yield every member of an organization, fetching pages concurrently once the total is known"""
     print(f"Looking up members for organization: {sid}")
     
-    url = f"https://robertsspaceindustries.com/en/orgs/{sid}/members"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    # The first page tells us how many members (and so how many pages) there are
+    total_rows, members = _fetch_members_page(sid, 1)
+    for member in members:
+        yield member
     
+    page_count = max(1, -(-total_rows // MEMBERS_PAGE_SIZE))
+    if page_count == 1:
+        return
+    print(f"Fetching {page_count - 1} more pages for {total_rows} members")
+    
+    # Keep only a small window of pages in flight so large orgs are never held in memory at once
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    next_page = 2
     try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        # Parse the HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-        members = []
-        
-        # Find all member items
-        member_items = soup.select(".member-item")
-        for item in member_items:
-            member_data = {}
-            
-            # Extract handle - try multiple possible selectors
-            handle_elem = None
-            
-            # Try different possible selectors for the handle
-            handle_selectors = [
-                ".nick .value",                # Original selector
-                ".member-info .nick",          # Alternative selector
-                ".member-info a",              # Direct link to member profile
-                "a.membercard-profile",        # Another possible link format
-                ".name",                       # Simple name class
-                "h3"                           # Generic heading that might contain the name
-            ]
+        while next_page <= page_count or pending:
+            while next_page <= page_count and len(pending) < workers * 2:
+                pending.append(executor.submit(_fetch_members_page, sid, next_page))
+                next_page += 1
             
-            for selector in handle_selectors:
-                handle_elem = item.select_one(selector)
-                if handle_elem and handle_elem.text.strip():
-                    member_data["handle"] = handle_elem.text.strip()
-                    break
-            
-            # If we still don't have a handle, try to extract it from href attribute
-            if "handle" not in member_data:
-                link_elem = item.select_one("a[href*='/citizens/']")
-                if link_elem and link_elem.has_attr('href'):
-                    # Extract handle from URL path
-                    href = link_elem['href']
-                    handle_match = re.search(r'/citizens/([^/]+)', href)
-                    if handle_match:
-                        member_data["handle"] = handle_match.group(1)
-            
-            # Extract rank
-            rank_elem = item.select_one(".rank .value") or item.select_one(".member-rank")
-            if rank_elem:
-                member_data["rank"] = rank_elem.text.strip()
-            
-            # Extract stars (rank level)
-            stars_elem = item.select_one(".stars")
-            if stars_elem and stars_elem.has_attr('class'):
-                stars_class = ' '.join(stars_elem['class'])
-                stars_match = re.search(r'stars-(\d+)', stars_class)
-                if stars_match:
-                    member_data["stars"] = int(stars_match.group(1))
-            
-            # Extract avatar
-            avatar_elem = item.select_one(".thumb img") or item.select_one(".member-thumb img")
-            if avatar_elem and avatar_elem.has_attr('src'):
-                avatar_src = avatar_elem['src']
-                # Make sure it's a full URL
-                if avatar_src.startswith('/'):
-                    avatar_src = f"https://robertsspaceindustries.com{avatar_src}"
-                member_data["avatar"] = avatar_src
-            
-            members.append(member_data)
-        
-        return members
-        
+            # Yield pages in order so the output matches the site's ordering
+            _, members = pending.popleft().result()
+            for member in members:
+                yield member
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def get_organization_members(sid, workers=4):
+    """Retrieve an organization's full members list from the RSI website"""
+    try:
+        return list(iter_organization_members(sid, workers))
     except requests.exceptions.RequestException as e:
         print(f"Error retrieving organization members: {e}")
         return None
+    except ValueError as e:
+        print(f"Error decoding organization members: {e}")
+        return None
+
+def handle_profile(params, context):
+    """Handler for organizations/profile; outside the server it also saves the profile to <sid>_profile.json"""
+    sid = params['sid']
+    filename = handler_registry.result_filename(sid, "_profile.json") if context.save_results else None
+    print(f"Using org_lookup.py to retrieve profile for organization: {sid}")
+    
+    org_data = get_organization_profile(sid, context.allow_stale)
+    if not org_data:
+        return None
+    
+    if filename:
+        with open(filename, 'w') as f:
+            json.dump(org_data, f, indent=2)
+    return org_data
+
+def handle_members(params, context):
+    """Handler for organizations/members; streams members page by page instead of building the whole list first"""
+    sid = params['sid']
+    filename = handler_registry.result_filename(sid, "_members.json") if context.save_results else None
+    print(f"Using org_lookup.py to retrieve members for organization: {sid}", file=sys.stderr)
+    members = _stream_members(sid, int(params.get('workers', 4)))
+    return _save_members(members, filename) if filename else members
+
+def _stream_members(sid, workers):
+    """Yield organization members as they arrive
+
+    A failure before any member arrives is raised so the caller sees a failed
+    lookup; once members have been streamed it ends the stream with an error item.
+    """
+    count = 0
+    try:
+        for member in iter_organization_members(sid, workers):
+            count += 1
+            yield member
+    except Exception as e:
+        print(f"Error calling iter_organization_members: {e}")
+        if not count:
+            raise
+        yield {"sid": sid, "error": str(e)}
+
+def _save_members(members, filename):
+    """Pass members through while writing them to a JSON array file
+
+    The file is only created once the first member arrives (or the list turns
+    out to be empty), so a failed first page does not look like an
+    organization without members.
+    """
+    f = None
+    try:
+        for member in members:
+            if f is None:
+                f = open(filename, 'w')
+                f.write("[")
+            else:
+                f.write(",")
+            f.write("\n  " + json.dumps(member))
+            yield member
+        if f is None:
+            with open(filename, 'w') as empty:
+                empty.write("[]\n")
+    finally:
+        if f is not None:
+            f.write("\n]\n")
+            f.close()
 
 def display_organization(org_data):
     """Display the organization profile in a formatted way"""
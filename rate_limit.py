@@ -0,0 +1,232 @@
+"""
+Rate Limit - Adaptive per-host token buckets and a jittered retry scheduler
+
+Every request to a host first takes a token from that host's bucket. The
+refill rate adapts to how the upstream responds: it grows quickly until the
+host first throttles us, and a 429 or 503 cuts it back and pauses the host
+for the Retry-After period. It then climbs quickly back toward the rate that was
+throttled and probes slowly above it, so it settles just under the highest
+rate the host tolerates. Throttled requests and dropped connections are retried with
+exponential backoff and full jitter until the request's deadline runs out, so
+callers see a throttling episode as a slower response instead of an error.
+
+Set SCTOOLS_RATE_LIMIT_DISABLE=1 to send requests without limiting or retries.
+"""
+
+import email.utils
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+ENABLED = os.environ.get("SCTOOLS_RATE_LIMIT_DISABLE", "").lower() not in ("1", "true", "yes")
+
+# Host -> (initial requests/second, maximum requests/second, burst size)
+HOST_LIMITS = {
+    "robertsspaceindustries.com": (4.0, 20.0, 8),
+    "starcitizen.tools": (5.0, 25.0, 10)
+}
+DEFAULT_LIMITS = (10.0, 50.0, 10)
+
+# Requests/second are never reduced below this, so a host is always probed again
+MIN_RATE = 0.2
+
+# Until a host first throttles us the rate grows by SLOW_START_GROWTH (a
+# fraction) per successful response. A throttle multiplies the rate by
+# RATE_DECREASE and sets the host's ceiling to CEILING_FACTOR times the rate
+# that was throttled. The rate then climbs back toward the ceiling, closing
+# RECOVERY_GROWTH of the gap per response, and past it probes upward by
+# RATE_INCREASE requests/second each second.
+SLOW_START_GROWTH = 0.05
+RECOVERY_GROWTH = 0.05
+RATE_INCREASE = 1.0
+RATE_DECREASE = 0.7
+CEILING_FACTOR = 0.9
+
+# Throttles arriving this soon after a decrease come from requests already in
+# flight at the old rate, so they do not reduce it again
+DECREASE_INTERVAL = 1.0
+
+# Responses that mean "slow down": the request was not processed and can be resent
+THROTTLE_STATUSES = frozenset([429, 503])
+
+MAX_RETRIES = int(os.environ.get("SCTOOLS_MAX_RETRIES", "4"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# Longest a request may spend waiting for tokens and retrying, in seconds
+DEFAULT_DEADLINE = float(os.environ.get("SCTOOLS_REQUEST_DEADLINE", "60"))
+
+# Methods resent after a dropped connection or timeout
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+class DeadlineExceeded(Exception):
+    """Raised when a request cannot be sent before its deadline"""
+
+def parse_retry_after(value):
+    """Return the delay in seconds requested by a Retry-After header, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class HostLimiter:
+    """Token bucket for one host whose refill rate adapts to throttling responses"""
+
+    def __init__(self, rate, max_rate, burst):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.burst = burst
+        # Start with a single token so a cold start does not open with a burst
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._decreased_at = float("-inf")
+        self._slow_start = True
+        self._ceiling = max_rate
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+
+    def _refill(self, now):
+        # Nothing accumulates while the host is paused
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self, deadline):
+        """Wait for a token; return False if none is available before the deadline (monotonic time)"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    self.requests += 1
+                    return True
+                else:
+                    wait = (1 - self._tokens) / self.rate
+
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def on_success(self):
+        """Raise the rate after a response the host accepted"""
+        with self._lock:
+            if self._slow_start:
+                rate = self.rate * (1 + SLOW_START_GROWTH)
+            elif self.rate < self._ceiling:
+                rate = self.rate + max((self._ceiling - self.rate) * RECOVERY_GROWTH, RATE_INCREASE / self.rate)
+            else:
+                # Responses arrive `rate` times a second, so this adds RATE_INCREASE per second
+                rate = self.rate + RATE_INCREASE / self.rate
+            self.rate = min(self.max_rate, rate)
+
+    def on_throttle(self, retry_after=None):
+        """Multiplicative decrease, and pause the host for Retry-After seconds if given"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.throttled += 1
+            self._slow_start = False
+            if now - self._decreased_at >= DECREASE_INTERVAL:
+                self._ceiling = self.rate * CEILING_FACTOR
+                self.rate = max(MIN_RATE, self.rate * RATE_DECREASE)
+                self._decreased_at = now
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+                self._updated = max(self._updated, self._paused_until)
+
+    def on_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": round(self.rate, 2),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "retries": self.retries
+            }
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(host):
+    """Return the shared limiter for a host, creating it on first use"""
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            rate, max_rate, burst = HOST_LIMITS.get(host, DEFAULT_LIMITS)
+            limiter = _limiters[host] = HostLimiter(rate, max_rate, burst)
+        return limiter
+
+def reset():
+    """Forget every host's learned rate"""
+    with _limiters_lock:
+        _limiters.clear()
+
+def stats():
+    """Return the current rate and counters of every host seen so far"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {host: limiter.stats() for host, limiter in limiters.items()}
+
+def send(method, url, send_fn, deadline=None, retry_exceptions=()):
+    """Send a request through its host's limiter, retrying throttled or dropped requests
+
+    send_fn() performs one attempt and returns a response with status_code and
+    headers. The last throttled response is returned once retries or the
+    deadline (seconds from now) run out, so callers handle it as before.
+    """
+    if not ENABLED:
+        return send_fn()
+
+    limiter = get_limiter(urlsplit(url).hostname or "")
+    expires = time.monotonic() + (DEFAULT_DEADLINE if deadline is None else deadline)
+    attempt = 0
+    while True:
+        if not limiter.acquire(expires):
+            raise DeadlineExceeded(f"No request slot for {url} before the deadline")
+
+        try:
+            response = send_fn()
+        except retry_exceptions:
+            if method.upper() not in IDEMPOTENT_METHODS or attempt >= MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay > expires:
+                raise
+        else:
+            if response.status_code not in THROTTLE_STATUSES:
+                limiter.on_success()
+                return response
+
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            limiter.on_throttle(retry_after)
+            delay = max(retry_after or 0.0, backoff_delay(attempt))
+            if attempt >= MAX_RETRIES or time.monotonic() + delay > expires:
+                return response
+
+        limiter.on_retry()
+        attempt += 1
+        time.sleep(delay)
@@ -0,0 +1,76 @@
+"""
+Reference Data - Built-in Galactapedia articles and common ship data, loaded once and frozen
+
+The data lives in modules/galactapedia/reference_data.json. It is read on
+first use and frozen into read-only mappings and tuples that are shared by
+every caller. The ship name/variant lookup tables and the fuzzy ship matcher
+are built at the same time.
+"""
+
+import json
+import os
+import threading
+from types import MappingProxyType
+from fuzzy_match import FuzzyMatcher
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "modules", "galactapedia", "reference_data.json")
+DATA_VERSION = 1
+
+_data = None
+_lock = threading.Lock()
+
+def freeze(value):
+    """Recursively convert dicts to read-only mappings and lists to tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    """Return a mutable (and JSON-serializable) deep copy of frozen data"""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+class ReferenceData:
+    """Frozen reference data with precomputed ship lookup tables"""
+
+    def __init__(self, data):
+        if data.get("version") != DATA_VERSION:
+            raise ValueError(f"Unsupported reference data version {data.get('version')}")
+
+        self.articles = freeze(data.get("articles", {}))
+        self.ships = freeze(data.get("ships", {}))
+
+        # Fuzzy matcher over ship names, variant names and "ship variant" pairs
+        matcher = FuzzyMatcher()
+        for ship_key, ship_info in self.ships.items():
+            matcher.add(ship_key, ("ship", ship_key))
+            for variant in ship_info.get("variants", ()):
+                matcher.add(variant, ("variant", ship_key, variant))
+                matcher.add(f"{ship_key} {variant}", ("variant", ship_key, variant))
+        # Each word of a multi-word name also finds its ship (e.g. "jump" for "890 jump"),
+        # after any ship or variant that is named by that word alone
+        for ship_key in self.ships:
+            words = ship_key.split()
+            if len(words) > 1:
+                for word in words:
+                    matcher.add(word, ("ship", ship_key))
+        self.ship_matcher = matcher
+
+def load(path=DATA_PATH):
+    """Read and freeze a reference data file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return ReferenceData(json.load(f))
+
+def get_reference_data():
+    """Return the shared reference data, loading it on first use"""
+    global _data
+    if _data is None:
+        with _lock:
+            if _data is None:
+                _data = load()
+    return _data
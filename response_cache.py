@@ -0,0 +1,180 @@
+"""
+Response Cache - Persistent SQLite cache of HTTP responses shared by all lookups
+
+Entries are keyed by the normalized request (method, URL, query parameters and
+JSON body) and kept on disk between runs. Each kind of resource has its own
+time-to-live; once an entry is stale it is revalidated with If-None-Match /
+If-Modified-Since so unchanged pages cost a 304 instead of a full download.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+CACHE_DIR = os.environ.get("SCTOOLS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+CACHE_PATH = os.path.join(CACHE_DIR, "responses.sqlite")
+
+# Set SCTOOLS_CACHE_DISABLE=1 to always go to the network
+CACHE_ENABLED = os.environ.get("SCTOOLS_CACHE_DISABLE", "") not in ("1", "true", "yes")
+
+# Time-to-live in seconds for each kind of cached resource
+TTLS = {
+    "citizen_profile": 3600,
+    "org_profile": 3600,
+    "org_members": 1800,
+    "galactapedia_search": 3600,
+    "galactapedia_article": 86400,
+    "galactapedia_category": 21600,
+    "galactapedia_categories": 86400,
+    "wiki_search": 3600,
+    "wiki_page": 3600
+}
+
+# Age in seconds after which a parsed profile is no longer served stale while
+# it is refreshed in the background, and must be fetched again before returning
+HARD_TTLS = {
+    "citizen_profile": 7 * 86400,
+    "org_profile": 7 * 86400
+}
+
+# Entries are only useful for revalidation until the longest TTL plus the longest
+# hard TTL has passed; older ones are pruned when the shared cache is opened and
+# then at most once every PRUNE_INTERVAL seconds while it is written to
+MAX_AGE = max(TTLS.values()) + max(HARD_TTLS.values())
+PRUNE_INTERVAL = 3600
+
+# Response headers worth keeping alongside the body
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+def normalize_key(method, url, params=None, json_body=None):
+    """Build a stable cache key from a request's method, URL, query parameters and JSON body"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(k), str(v)) for k, v in params.items())
+    query.sort()
+
+    key = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(query), ""))
+    key = f"{method.upper()} {key}"
+    if json_body is not None:
+        key += " " + json.dumps(json_body, sort_keys=True, separators=(",", ":"))
+    return key
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response built from a cache entry"""
+
+    def __init__(self, url, status_code, headers, content, encoding):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        # Only successful responses are ever stored
+        return None
+
+class ResponseCache:
+    """SQLite-backed store of response bodies and their validators"""
+
+    def __init__(self, path=CACHE_PATH, max_age=None):
+        self.path = path
+        self.max_age = max_age
+        self._pruned_at = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " status INTEGER NOT NULL,"
+            " headers TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " encoding TEXT,"
+            " stored_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        if max_age is not None:
+            self.prune(max_age)
+
+    def lookup(self, key):
+        """Return (CachedResponse, stored_at) for a key, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, encoding, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        url, status, headers, body, encoding, stored_at = row
+        return CachedResponse(url, status, json.loads(headers), bytes(body), encoding), stored_at
+
+    def store(self, key, response):
+        """Store a successful response"""
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        encoding = response.encoding or response.apparent_encoding
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, headers, body, encoding, stored_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.status_code, json.dumps(headers), response.content, encoding, time.time())
+            )
+            self._conn.commit()
+        if self.max_age is not None and time.time() - self._pruned_at > PRUNE_INTERVAL:
+            self.prune(self.max_age)
+
+    def touch(self, key):
+        """Mark an entry as freshly validated"""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def delete(self, key):
+        """Remove a single entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def prune(self, max_age):
+        """Remove entries older than max_age seconds and return how many were removed"""
+        with self._lock:
+            self._pruned_at = time.time()
+            cursor = self._conn.execute("DELETE FROM responses WHERE stored_at < ?", (self._pruned_at - max_age,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Return the shared cache, opening it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(CACHE_PATH, max_age=MAX_AGE)
+    return _cache
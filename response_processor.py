@@ -0,0 +1,165 @@
+"""
+Response Processor - Compiles the responseProcessor declarations in module.json and applies them to HTML
+
+A responseProcessor looks like:
+
+    {
+      "type": "html",
+      "selector": ".member-item",      (optional root; fields are selected inside it)
+      "isArray": true,                 (optional; one result per root match)
+      "fields": [
+        {"name": "avatar", "selector": ".thumb img", "type": "attribute", "attribute": "src", "absoluteUrl": true},
+        {"name": "stars", "selector": ".stars", "type": "attribute", "attribute": "class",
+         "transform": "stars-(\\d+)", "valueType": "integer"},
+        {"name": "enlisted", "selector": "div.left-col .entry", "label": "enlisted", "type": "text"}
+      ]
+    }
+
+Field types are "text", "attribute" and "html". A "transform" regex keeps its
+first group, "collapseWhitespace" squashes runs of whitespace, "absoluteUrl"
+prefixes site-relative URLs with the module's baseUrl and "valueType" converts
+the result to an integer or float. Fields with a "label" pick the first
+matching element whose `labelSelector` (default ".label") text contains the
+label, and read the value from its `valueSelector` (default ".value").
+
+A processor can also list "parseOnly" classes; only elements carrying one
+of them (and their descendants) are built into the tree, so every field
+selector must fall inside those regions.
+
+Selectors and regexes are compiled once, the first time a resource's processor
+is needed, and reused for every response.
+"""
+
+import json
+import re
+import html_parser
+
+FIELD_TYPES = ("text", "attribute", "html")
+VALUE_TYPES = {"integer": int, "float": float, "string": str}
+
+def compile_selector(selector):
+    """Compile a CSS selector, accepting the legacy :contains() pseudo-class"""
+    return html_parser.Selector(selector)
+
+class CompiledField:
+    """A single field spec with its selectors and transform precompiled"""
+
+    def __init__(self, spec, base_url=None):
+        self.name = spec["name"]
+        self.type = spec.get("type", "text")
+        if self.type not in FIELD_TYPES:
+            raise ValueError(f"Unsupported field type '{self.type}' for field '{self.name}'")
+        if self.type == "attribute" and "attribute" not in spec:
+            raise ValueError(f"Field '{self.name}' has type 'attribute' but no 'attribute'")
+
+        self.selector = compile_selector(spec["selector"])
+        self.attribute = spec.get("attribute")
+        self.transform = re.compile(spec["transform"]) if "transform" in spec else None
+        self.collapse_whitespace = spec.get("collapseWhitespace", False)
+        self.base_url = base_url if spec.get("absoluteUrl", False) else None
+        self.value_type = VALUE_TYPES[spec["valueType"]] if "valueType" in spec else None
+
+        # Labelled entries (e.g. "Enlisted" / "Location" rows) are matched by label text
+        self.label = spec["label"].lower() if "label" in spec else None
+        self.label_selector = compile_selector(spec.get("labelSelector", ".label")) if self.label else None
+        self.value_selector = compile_selector(spec.get("valueSelector", ".value")) if self.label else None
+
+    def _find(self, root):
+        """Return the element holding this field's value, or None"""
+        if self.label is None:
+            return self.selector.select_one(root)
+
+        for entry in self.selector.select(root):
+            label_elem = self.label_selector.select_one(entry)
+            if label_elem and self.label in label_elem.text.strip().lower():
+                return self.value_selector.select_one(entry)
+        return None
+
+    def extract(self, root):
+        """Return this field's value within root, or None if it is not present"""
+        elem = self._find(root)
+        if elem is None:
+            return None
+
+        if self.type == "attribute":
+            if not elem.has_attr(self.attribute):
+                return None
+            value = elem[self.attribute]
+            if isinstance(value, list):
+                value = " ".join(value)
+        elif self.type == "html":
+            value = elem.decode_contents().strip()
+        else:
+            value = elem.text.strip()
+
+        if self.transform is not None:
+            match = self.transform.search(value)
+            if not match:
+                return None
+            value = match.group(1) if match.groups() else match.group(0)
+
+        if self.collapse_whitespace:
+            value = re.sub(r'\s+', ' ', value)
+
+        if self.base_url and value.startswith('/'):
+            value = f"{self.base_url}{value}"
+
+        if self.value_type is not None:
+            try:
+                value = self.value_type(value)
+            except ValueError:
+                return None
+
+        return value
+
+class ResponseProcessor:
+    """A compiled responseProcessor that extracts fields from HTML"""
+
+    def __init__(self, spec, base_url=None):
+        if spec.get("type", "html") != "html":
+            raise ValueError(f"Unsupported responseProcessor type '{spec.get('type')}'")
+        self.root_selector = compile_selector(spec["selector"]) if spec.get("selector") else None
+        self.is_array = spec.get("isArray", False)
+        self.parse_only = spec.get("parseOnly") or None
+        self.fields = [CompiledField(field, base_url) for field in spec.get("fields", [])]
+
+    def extract_fields(self, root):
+        """Apply every field to one root element, skipping fields that are not present"""
+        data = {}
+        for field in self.fields:
+            value = field.extract(root)
+            if value is not None:
+                data[field.name] = value
+        return data
+
+    def process_tree(self, tree):
+        """Extract data from a document already parsed with html_parser"""
+        if self.is_array:
+            roots = self.root_selector.select(tree) if self.root_selector else [tree]
+            return [self.extract_fields(root) for root in roots]
+
+        root = self.root_selector.select_one(tree) if self.root_selector else tree
+        if root is None:
+            return {}
+        return self.extract_fields(root)
+
+    def process(self, html, backend=None):
+        """Parse the regions of an HTML document this processor needs and extract data from them"""
+        return self.process_tree(html_parser.parse_html(html, backend, only_classes=self.parse_only))
+
+def compile_module_processors(module):
+    """Compile every responseProcessor declared in a module manifest, keyed by resource name"""
+    processors = {}
+    for resource in module.get("resources", []):
+        if "responseProcessor" in resource:
+            processors[resource["name"]] = ResponseProcessor(resource["responseProcessor"], module.get("baseUrl"))
+    return processors
+
+def load_processor(module_path, resource_name):
+    """Load a module manifest from disk and compile one resource's responseProcessor"""
+    with open(module_path, 'r') as f:
+        module = json.load(f)
+    for resource in module.get("resources", []):
+        if resource["name"] == resource_name and "responseProcessor" in resource:
+            return ResponseProcessor(resource["responseProcessor"], module.get("baseUrl"))
+    raise KeyError(resource_name)
@@ -4,14 +4,31 @@ This script provides a more direct way to interact with the wiki.
 """
 
 import requests
+import http_session
 import json
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import handler_registry
+import response_cache
+import wiki_cache
+
+API_URL = "https://starcitizen.tools/api.php"
+
+# Maximum number of titles MediaWiki accepts in one query for regular clients
+TITLES_PER_REQUEST = 50
+
+# Search results requested per API call when iterating over a whole result set
+SEARCH_PAGE_SIZE = 50
+
+# Number of changed pages re-parsed at once by refresh_wiki_pages
+REFRESH_WORKERS = 4
 
 def search_wiki(search_term, limit=5):
     """Search the Star Citizen Tools wiki for articles"""
     print(f"Searching for: {search_term}")
     
-    url = "https://starcitizen.tools/api.php"
+    url = API_URL
     params = {
         "action": "query",
         "list": "search",
@@ -21,7 +38,7 @@ def search_wiki(search_term, limit=5):
     }
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = http_session.get(url, params=params, timeout=10, cache="wiki_search")
         response.raise_for_status()
         data = response.json()
         
@@ -36,7 +53,8 @@ def search_wiki(search_term, limit=5):
                 print(f"{i}. {result['title']}")
                 print(f"   Page ID: {result['pageid']}")
                 if 'snippet' in result:
-                    print(f"   Snippet: {result['snippet'].replace('<span class=\"searchmatch\">', '').replace('</span>', '')}")
+                    snippet = result['snippet'].replace('<span class="searchmatch">', '').replace('</span>', '')
+                    print(f"   Snippet: {snippet}")
                 print()
             
             return results
@@ -48,26 +66,155 @@ def search_wiki(search_term, limit=5):
         print(f"Error searching wiki: {e}")
         return []
 
-def get_wiki_page(page_title):
-    """Get information about a specific wiki page"""
-    print(f"Getting information about: {page_title}")
+def _search_page(search_term, page_size, continuation):
+    """Fetch one page of search results; return (results, continuation for the next page or None)"""
+    params = {
+        "action": "query",
+        "list": "search",
+        "srsearch": search_term,
+        "format": "json",
+        "srlimit": str(page_size)
+    }
+    params.update(continuation)
+    
+    response = http_session.get(API_URL, params=params, timeout=10, cache="wiki_search")
+    response.raise_for_status()
+    data = response.json()
+    return data.get("query", {}).get("search", []), data.get("continue")
+
+def iter_search_wiki(search_term, page_size=SEARCH_PAGE_SIZE, max_results=None):
+    """Yield every search result, fetching the next page in the background while the current one is consumed
     
-    url = "https://starcitizen.tools/api.php"
+    Iteration stops at max_results (if given) or when the caller stops iterating;
+    the pending prefetch is then cancelled.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(_search_page, search_term, page_size, {})
+    yielded = 0
+    try:
+        while future is not None:
+            results, continuation = future.result()
+            
+            # Start on the next page before handing out this one
+            future = None
+            if continuation and (max_results is None or yielded + len(results) < max_results):
+                future = executor.submit(_search_page, search_term, page_size, continuation)
+            
+            for result in results:
+                if max_results is not None and yielded >= max_results:
+                    return
+                yield result
+                yielded += 1
+    finally:
+        if future is not None:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def _parse_page(page_title):
+    """Fetch a page's parsed HTML and revision ID with action=parse, or None if it does not exist"""
     params = {
         "action": "parse",
         "page": page_title,
         "format": "json",
-        "prop": "text",
+        "prop": "text|revid",
         "redirects": "1"
     }
     
-    try:
-        response = requests.get(url, params=params, timeout=10)
+    response = http_session.get(API_URL, params=params, timeout=10)
+    response.raise_for_status()
+    return response.json().get("parse")
+
+def get_latest_revisions(titles):
+    """Return {title: latest revision ID, or None if the page is gone} using batched prop=info queries"""
+    titles = list(dict.fromkeys(titles))
+    revisions = {}
+    for start in range(0, len(titles), TITLES_PER_REQUEST):
+        params = {
+            "action": "query",
+            "titles": "|".join(titles[start:start + TITLES_PER_REQUEST]),
+            "prop": "info",
+            "format": "json",
+            "formatversion": "2"
+        }
+        response = http_session.get(API_URL, params=params, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        for page in response.json().get("query", {}).get("pages", []):
+            revisions[page["title"]] = None if page.get("missing") or page.get("invalid") else page.get("lastrevid")
+    return revisions
+
+def _get_parsed_page(page_title):
+    """Return a page's parse output, re-parsing it only when its revision has moved on"""
+    key = page_title.strip()
+    if not response_cache.CACHE_ENABLED:
+        return _parse_page(key)
+    
+    store = wiki_cache.get_wiki_cache()
+    entry = store.lookup(key)
+    if entry is not None:
+        parse_data, revid, checked_at = entry
+        if time.time() - checked_at < response_cache.TTLS["wiki_page"]:
+            return parse_data
+        
+        # Stale: ask for the latest revision instead of downloading the page again
+        title = parse_data["title"]
+        try:
+            latest = get_latest_revisions([title])
+        except requests.exceptions.RequestException as e:
+            # Better an outdated page than none; the revision is checked again on the next call
+            print(f"Could not check the revision of {title}, using the cached page: {e}")
+            return parse_data
+        if title in latest and latest[title] is None:
+            # The page is gone; drop it so later calls don't check and re-parse it again
+            store.delete(key)
+            return None
+        if latest.get(title) == revid:
+            store.touch([key])
+            return parse_data
+    
+    parse_data = _parse_page(key)
+    if parse_data is not None:
+        store.store(key, parse_data)
+    return parse_data
+
+def refresh_wiki_pages(titles=None, workers=REFRESH_WORKERS):
+    """Bring cached wiki pages up to date, re-parsing only those whose revision changed"""
+    store = wiki_cache.get_wiki_cache()
+    entries = store.entries()
+    if titles is not None:
+        wanted = set(title.strip() for title in titles)
+        entries = [entry for entry in entries if entry[0] in wanted]
+    
+    latest = get_latest_revisions([title for _, title, _ in entries])
+    unchanged, changed, removed = [], [], 0
+    for key, title, revid in entries:
+        if title not in latest:
+            continue
+        if latest[title] is None:
+            store.delete(key)
+            removed += 1
+        elif latest[title] == revid:
+            unchanged.append(key)
+        else:
+            changed.append(key)
+    store.touch(unchanged)
+    
+    updated = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for key, parse_data in zip(changed, executor.map(_parse_page, changed)):
+            if parse_data is not None:
+                store.store(key, parse_data)
+                updated += 1
+    
+    return {"checked": len(entries), "unchanged": len(unchanged), "updated": updated, "removed": removed}
+
+def get_wiki_page(page_title):
+    """Get information about a specific wiki page"""
+    print(f"Getting information about: {page_title}")
+    
+    try:
+        parse_data = _get_parsed_page(page_title)
         
-        if "parse" in data:
-            parse_data = data["parse"]
+        if parse_data is not None:
             print(f"Title: {parse_data.get('title', 'Unknown')}")
             print(f"Page ID: {parse_data.get('pageid', 'Unknown')}")
             
@@ -87,11 +234,113 @@ def get_wiki_page(page_title):
         print(f"Error getting wiki page: {e}")
         return None
 
+def _query_pages(titles):
+    """Fetch one batch of titles with action=query, following continuation, and return the merged pages"""
+    params = {
+        "action": "query",
+        "titles": "|".join(titles),
+        "prop": "info|revisions|extracts",
+        "rvprop": "ids|timestamp|content",
+        "rvslots": "main",
+        "exintro": "1",
+        "explaintext": "1",
+        "exlimit": "max",
+        "redirects": "1",
+        "format": "json",
+        "formatversion": "2"
+    }
+    
+    pages = {}
+    while True:
+        response = http_session.get(API_URL, params=params, timeout=30, cache="wiki_page")
+        response.raise_for_status()
+        data = response.json()
+        
+        # Each continuation fills in more of the same pages (intro extracts come at most 20 per response)
+        for page in data.get("query", {}).get("pages", []):
+            merged = pages.setdefault(page["title"], {})
+            for key, value in page.items():
+                if value or key not in merged:
+                    merged[key] = value
+        
+        if "continue" not in data:
+            return list(pages.values())
+        params.update(data["continue"])
+
+def _summarize_page(page):
+    """Flatten a formatversion=2 page into the fields callers need"""
+    if page.get("missing") or page.get("invalid"):
+        return {"title": page["title"], "missing": True}
+    
+    result = {
+        "title": page["title"],
+        "pageid": page.get("pageid"),
+        "lastrevid": page.get("lastrevid"),
+        "touched": page.get("touched"),
+        "extract": page.get("extract", "")
+    }
+    revisions = page.get("revisions") or []
+    if revisions:
+        revision = revisions[0]
+        result["revid"] = revision.get("revid")
+        result["timestamp"] = revision.get("timestamp")
+        result["wikitext"] = revision.get("slots", {}).get("main", {}).get("content", "")
+    return result
+
+def iter_wiki_pages(titles, batch_size=TITLES_PER_REQUEST):
+    """Yield many wiki pages, fetching up to batch_size titles per API request"""
+    titles = list(dict.fromkeys(title.strip() for title in titles if title.strip()))
+    batch_size = max(1, min(batch_size, TITLES_PER_REQUEST))
+    
+    for start in range(0, len(titles), batch_size):
+        batch = titles[start:start + batch_size]
+        print(f"Getting {len(batch)} wiki pages ({start + len(batch)}/{len(titles)})")
+        for page in _query_pages(batch):
+            yield _summarize_page(page)
+
+def get_wiki_pages(titles, batch_size=TITLES_PER_REQUEST):
+    """Get many wiki pages with as few API requests as possible"""
+    try:
+        return list(iter_wiki_pages(titles, batch_size))
+    except Exception as e:
+        print(f"Error getting wiki pages: {e}")
+        return []
+
+def handle_search(params, context):
+    """Handler for wiki/search"""
+    query = params['srsearch']
+    print(f"Using simple_example.py to search wiki for: {query}")
+    return search_wiki(query)
+
+def handle_search_all(params, context):
+    """Handler for wiki/search_all; streams every result"""
+    query = params['srsearch']
+    max_results = int(params['maxResults']) if params.get('maxResults') else None
+    page_size = int(params.get('pageSize', SEARCH_PAGE_SIZE))
+    print(f"Using simple_example.py to stream wiki search results for: {query}", file=sys.stderr)
+    return iter_search_wiki(query, page_size, max_results)
+
+def handle_wiki_page(params, context):
+    """Handler for wiki/wiki_page"""
+    page = params['page']
+    print(f"Using simple_example.py to retrieve wiki page: {page}")
+    return get_wiki_page(page)
+
+def handle_pages_batch(params, context):
+    """Handler for wiki/pages_batch"""
+    titles = handler_registry.list_param(params, 'titles', 'titlesFile', context)
+    # MediaWiki accepts at most TITLES_PER_REQUEST titles per query
+    batch_size = handler_registry.int_param(params, 'batchSize', TITLES_PER_REQUEST, 1, TITLES_PER_REQUEST)
+    print(f"Using simple_example.py to retrieve {len(titles)} wiki pages")
+    return get_wiki_pages(titles, batch_size)
+
 def main():
     if len(sys.argv) < 2:
         print("Usage:")
         print("  Search:  python simple_example.py search <term>")
         print("  Get page: python simple_example.py page <page_title>")
+        print("  Get pages: python simple_example.py pages <title> [<title> ...]")
+        print("  Refresh cached pages: python simple_example.py refresh [<title> ...]")
         return
     
     command = sys.argv[1].lower()
@@ -102,8 +351,15 @@ def main():
     elif command == "page" and len(sys.argv) >= 3:
         page_title = " ".join(sys.argv[2:])
         get_wiki_page(page_title)
+    elif command == "pages" and len(sys.argv) >= 3:
+        pages = get_wiki_pages(sys.argv[2:])
+        print(json.dumps(pages, indent=2))
+    elif command == "refresh":
+        stats = refresh_wiki_pages(sys.argv[2:] or None)
+        print(f"Checked {stats['checked']} cached pages: {stats['unchanged']} unchanged, "
+              f"{stats['updated']} re-parsed, {stats['removed']} removed")
     else:
-        print("Invalid command. Use 'search' or 'page'.")
+        print("Invalid command. Use 'search', 'page', 'pages' or 'refresh'.")
 
 if __name__ == "__main__":
     main()
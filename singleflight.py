@@ -0,0 +1,76 @@
+"""
+Single Flight - Coalesces concurrent identical calls into one execution
+
+When several threads ask for the same key at once, the first one runs the
+call and the others wait for its result instead of repeating the upstream
+request and parse. Nothing is remembered once the call completes; caching is
+left to the response and memory caches.
+"""
+
+import threading
+
+class _Call:
+    """One in-flight execution and the outcome shared with its waiters"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.shareable = True
+
+class SingleFlight:
+    """Run at most one call per key at a time, handing its result to concurrent callers"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, shareable=None, **kwargs):
+        """Call fn(*args, **kwargs), or wait for the identical call already in flight for key
+
+        Results are shared, not copied, so callers must treat them as read-only.
+        If shareable(result) is false (e.g. a generator, which only one consumer
+        can iterate), waiting callers run fn themselves instead.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.executed += 1
+            else:
+                leader = False
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+                call.shareable = shareable is None or shareable(call.result)
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        call.done.wait()
+        if not call.shareable:
+            return fn(*args, **kwargs)
+        with self._lock:
+            self.coalesced += 1
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def in_flight(self):
+        """Return the number of keys currently being executed"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self):
+        """Return how many calls ran and how many were served by another caller's execution"""
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
@@ -0,0 +1,113 @@
+"""
+Stale Cache - Stale-while-revalidate serving on top of the in-memory LRU cache
+
+Each entry has a soft and a hard TTL. Before the soft TTL it is simply
+returned. Between the soft and hard TTL it is returned immediately when the
+caller allows stale data, and a background refresh replaces it; otherwise it
+is fetched again synchronously. After the hard TTL it is gone and always
+fetched synchronously.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from memory_cache import LRUCache, estimate_size
+
+# Number of background refreshes run at once (per cache)
+REFRESH_WORKERS = 2
+
+class StaleWhileRevalidateCache:
+    """LRU cache of fetched values that can serve stale entries while refreshing them"""
+
+    def __init__(self, soft_ttl, hard_ttl, max_entries=1024, max_bytes=None, workers=REFRESH_WORKERS):
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        # Entries are (value, fetched_at); only the value counts toward max_bytes
+        self.cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=hard_ttl,
+                              sizeof=lambda entry: estimate_size(entry[0]))
+        self.workers = workers
+        self._executor = None
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def get(self, key, fetch, allow_stale=False):
+        """Return the value for key, calling fetch() when it is missing or too old
+
+        fetch() returns the new value, or None if it could not be retrieved
+        (None is never cached).
+        """
+        entry = self.cache.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            if time.time() - fetched_at < self.soft_ttl:
+                return value
+            if allow_stale:
+                with self._lock:
+                    self.stale_hits += 1
+                self._refresh_in_background(key, fetch)
+                return value
+
+        value = fetch()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def set(self, key, value):
+        """Store a freshly fetched value"""
+        self.cache.set(key, (value, time.time()))
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+    def _refresh_in_background(self, key, fetch):
+        """Start a refresh for key unless one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stale-refresh")
+            executor = self._executor
+        executor.submit(self._refresh, key, fetch)
+
+    def _refresh(self, key, fetch):
+        try:
+            value = fetch()
+        except Exception as e:
+            print(f"Background refresh of {key} failed: {e}")
+            value = None
+        if value is not None:
+            self.set(key, value)
+
+        with self._lock:
+            self._refreshing.discard(key)
+            if value is None:
+                # Keep serving the stale copy until the hard TTL; a later call retries
+                self.refresh_failures += 1
+            else:
+                self.refreshes += 1
+
+    def stats(self):
+        """Return LRU counters plus stale-serving and refresh counters"""
+        stats = self.cache.stats()
+        with self._lock:
+            stats.update({
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "refreshing": len(self._refreshing)
+            })
+        return stats
+
+    def shutdown(self, wait=True):
+        """Stop the background refresh workers"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,152 @@
+"""
+Startup Profile - Import-time and time-to-first-byte breakdown of a client.py run
+
+`python client.py --profile-startup <command> ...` runs the command again in
+a child interpreter started with `-X importtime`. The child marks the
+milestones of its run (arguments parsed, configuration loaded, handler
+imported, first request sent, first byte received, output written) in a file
+named by SCTOOLS_PROFILE_PHASES. The parent then prints a timeline of those
+milestones, import time grouped by dependency, and the slowest individual
+imports to stderr. The command's own output is passed through unchanged.
+"""
+
+import atexit
+import json
+import os
+import re
+import sys
+import time
+
+PHASES_ENV = "SCTOOLS_PROFILE_PHASES"
+
+# Set in the child process being profiled
+_phases_path = os.environ.get(PHASES_ENV)
+ENABLED = bool(_phases_path)
+_phases = []
+_first_response = None
+
+# Top-level modules reported together
+IMPORT_GROUPS = {
+    "network stack": ("requests", "urllib3", "certifi", "charset_normalizer", "chardet", "idna", "ssl", "http", "socket"),
+    "HTML parsing": ("bs4", "soupsieve", "lxml", "selectolax", "html5lib"),
+    "storage": ("sqlite3", "_sqlite3")
+}
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Number of individual imports listed in the report
+SLOWEST_IMPORTS = 15
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def mark(name):
+    """Record that the run reached a milestone (no-op unless profiling)"""
+    if ENABLED:
+        _phases.append((name, time.time()))
+
+def record_response(started, response):
+    """Record when the first network request was sent and when its first byte arrived"""
+    global _first_response
+    if not ENABLED or _first_response is not None:
+        return
+    # requests measures elapsed from sending the request until the response headers were parsed
+    elapsed = getattr(response, "elapsed", None)
+    first_byte = started + elapsed.total_seconds() if elapsed is not None else None
+    _first_response = (getattr(response, "url", ""), started, first_byte, time.time())
+    _phases.append(("first request sent", started))
+    if first_byte is not None:
+        _phases.append(("first byte received", first_byte))
+    _phases.append(("first response read", _first_response[3]))
+
+def _write_phases():
+    mark("exit")
+    try:
+        with open(_phases_path, "w") as f:
+            json.dump({"phases": _phases, "first_url": _first_response[0] if _first_response else None}, f)
+    except OSError:
+        pass
+
+if ENABLED:
+    atexit.register(_write_phases)
+
+def parse_importtime(lines):
+    """Parse `-X importtime` lines into (module, self us, cumulative us, depth) tuples"""
+    imports = []
+    for line in lines:
+        match = IMPORTTIME_RE.match(line.rstrip("\n"))
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+def _group_of(name):
+    top_level = name.split(".")[0]
+    for group, modules in IMPORT_GROUPS.items():
+        if top_level in modules:
+            return group
+    if os.path.exists(os.path.join(PROJECT_DIR, top_level + ".py")):
+        return "project"
+    return "other"
+
+def format_report(argv, launched, finished, phases, imports, out=None):
+    """Print the timeline, grouped import time and slowest imports"""
+    out = out or sys.stderr
+    print(f"\nStartup profile: python {' '.join(argv)}", file=out)
+    print(f"Total wall time: {(finished - launched) * 1000:.1f} ms", file=out)
+
+    print("\nTimeline (ms since launch):", file=out)
+    previous = launched
+    for name, at in sorted(phases, key=lambda phase: phase[1]):
+        print(f"  {(at - launched) * 1000:9.1f}  {name:<28} (+{(at - previous) * 1000:.1f})", file=out)
+        previous = at
+    if not any(name == "first request sent" for name, _ in phases):
+        print("  (no network request was made)", file=out)
+
+    totals = {}
+    for name, self_us, _, _ in imports:
+        group = _group_of(name)
+        totals[group] = totals.get(group, 0) + self_us
+    print(f"\nImport time by group ({len(imports)} modules, {sum(totals.values()) / 1000:.1f} ms):", file=out)
+    for group in list(IMPORT_GROUPS) + ["project", "other"]:
+        if group in totals:
+            print(f"  {group:<16} {totals[group] / 1000:8.1f} ms", file=out)
+        else:
+            print(f"  {group:<16} {'not imported':>11}", file=out)
+
+    print("\nSlowest imports (self / cumulative ms):", file=out)
+    for name, self_us, cumulative_us, _ in sorted(imports, key=lambda item: item[1], reverse=True)[:SLOWEST_IMPORTS]:
+        print(f"  {self_us / 1000:8.1f} {cumulative_us / 1000:9.1f}  {name}", file=out)
+
+def run_profiled(script, args):
+    """Run `script args` in a child interpreter with -X importtime and report where the time went"""
+    import subprocess
+    import tempfile
+
+    fd, phases_path = tempfile.mkstemp(prefix="sctools-startup-", suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, **{PHASES_ENV: phases_path})
+    command = [sys.executable, "-X", "importtime", script] + list(args)
+
+    launched = time.time()
+    child = subprocess.Popen(command, env=env, stderr=subprocess.PIPE, text=True)
+    import_lines = []
+    # -X importtime writes to stderr; forward everything else the child prints there
+    for line in child.stderr:
+        if line.startswith("import time:"):
+            import_lines.append(line)
+        else:
+            sys.stderr.write(line)
+    returncode = child.wait()
+    finished = time.time()
+
+    try:
+        with open(phases_path, "r") as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        recorded = {"phases": []}
+    finally:
+        os.remove(phases_path)
+
+    phases = [("launch", launched)] + [tuple(phase) for phase in recorded["phases"]]
+    format_report([os.path.basename(script)] + list(args), launched, finished, phases, parse_importtime(import_lines))
+    return returncode
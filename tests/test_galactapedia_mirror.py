@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from galactapedia_mirror import GalactapediaMirror
+
+CATEGORY = {"id": "ships", "title": "Ships", "url": "https://example.test/category/ships"}
+
+def listing(description):
+    return [{"id": "abc123", "title": "Carrack", "description": description, "url": "https://example.test/abc123"}]
+
+def test_changed_article_is_retried_after_failed_refetch(tmp_path):
+    mirror = GalactapediaMirror(str(tmp_path / "mirror.sqlite"))
+    try:
+        assert mirror.store_category(CATEGORY, listing("Explorer")) == ["abc123"]
+        mirror.store_article({"id": "abc123", "content": "old content"})
+        assert mirror.store_category(CATEGORY, listing("Explorer")) == []
+
+        # The listing changed and the refetch failed, so store_article was never called
+        assert mirror.store_category(CATEGORY, listing("Long-range explorer")) == ["abc123"]
+        assert "content" not in mirror.get_article("abc123")
+        assert mirror.store_category(CATEGORY, listing("Long-range explorer")) == ["abc123"]
+
+        mirror.store_article({"id": "abc123", "content": "new content"})
+        assert mirror.store_category(CATEGORY, listing("Long-range explorer")) == []
+        assert mirror.get_article("abc123")["content"] == "new content"
+    finally:
+        mirror.close()
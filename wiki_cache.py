@@ -0,0 +1,124 @@
+"""
+Wiki Cache - Revision-aware store of parsed wiki pages
+
+Each page's parse output is kept with the revision it was parsed from. A
+stale entry is not re-downloaded: one lightweight batched `prop=info` query
+tells whether the page's latest revision moved, and only pages that changed
+are parsed again.
+
+Extracted infoboxes are kept alongside, keyed by title and revision, so a
+page's infobox is only extracted once per edit.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import response_cache
+
+WIKI_CACHE_PATH = os.path.join(response_cache.CACHE_DIR, "wiki_pages.sqlite")
+
+class WikiPageCache:
+    """SQLite-backed store of parsed wiki pages keyed by requested title"""
+
+    def __init__(self, path=WIKI_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS wiki_pages ("
+            " key TEXT PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " revid INTEGER NOT NULL,"
+            " data TEXT NOT NULL,"
+            " checked_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS wiki_infoboxes ("
+            " title TEXT PRIMARY KEY,"
+            " revid INTEGER NOT NULL,"
+            " data TEXT NOT NULL);"
+        )
+        self._conn.commit()
+
+    def lookup(self, key):
+        """Return (parse data, revid, checked_at) for a requested title, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, revid, checked_at FROM wiki_pages WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, revid, checked_at = row
+        return json.loads(data), revid, checked_at
+
+    def store(self, key, data):
+        """Store a page's parse output along with the revision it came from"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO wiki_pages (key, title, revid, data, checked_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data.get("title", key), data.get("revid", 0), json.dumps(data), time.time())
+            )
+            self._conn.commit()
+
+    def touch(self, keys):
+        """Mark entries as confirmed current"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE wiki_pages SET checked_at = ? WHERE key = ?", [(time.time(), key) for key in keys]
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        """Remove a single entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM wiki_pages WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def lookup_infobox(self, title, revid):
+        """Return the infobox extracted from a page revision, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM wiki_infoboxes WHERE title = ? AND revid = ?", (title, revid)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def store_infobox(self, title, revid, data):
+        """Store the infobox extracted from a page revision, replacing older revisions"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO wiki_infoboxes (title, revid, data) VALUES (?, ?, ?)",
+                (title, revid, json.dumps(data))
+            )
+            self._conn.commit()
+
+    def entries(self):
+        """Return (key, title, revid) for every cached page"""
+        with self._lock:
+            return self._conn.execute("SELECT key, title, revid FROM wiki_pages ORDER BY key").fetchall()
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM wiki_pages")
+            self._conn.execute("DELETE FROM wiki_infoboxes")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_wiki_cache():
+    """Return the shared wiki page cache, opening it on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = WikiPageCache(WIKI_CACHE_PATH)
+    return _cache
@@ -0,0 +1,134 @@
+"""
+Wiki Infobox - Extracts the infobox of a Star Citizen Tools wiki page into a typed dict
+
+Ship, vehicle and location pages carry an infobox (manufacturer, role, size,
+cargo capacity, ...). extract_infobox() reads it in one pass over the parsed
+page HTML with precompiled selectors, so callers get a few hundred bytes of
+fields instead of the whole page. Results are cached per page revision, so a
+page is only re-extracted after it has been edited.
+
+Both infobox layouts used on the wiki are understood: the Citizen skin's
+`.infobox__item` label/data rows and the older `table.infobox` rows.
+"""
+
+import re
+import sys
+import json
+import html_parser
+import simple_example
+import wiki_cache
+
+# Only the infobox regions are built into the tree on the BeautifulSoup backends
+INFOBOX_CLASSES = ["infobox"]
+
+INFOBOX = html_parser.Selector(".infobox")
+TITLE = html_parser.Selector(".infobox__title")
+SUBTITLE = html_parser.Selector(".infobox__subtitle")
+ITEMS = html_parser.Selector(".infobox__item")
+ITEM_LABEL = html_parser.Selector(".infobox__label")
+ITEM_DATA = html_parser.Selector(".infobox__data")
+TABLE_ROWS = html_parser.Selector("tr")
+ROW_LABEL = html_parser.Selector("th")
+ROW_DATA = html_parser.Selector("td")
+LIST_ITEMS = html_parser.Selector("li")
+
+# "456 SCU", "1,200 kg", "-12.5 m/s" -> number and optional unit
+NUMBER_RE = re.compile(r'^(-?\d[\d,]*(?:\.\d+)?)\s*([^\d\s][^\d]*)?$')
+
+def field_name(label):
+    """Turn an infobox label such as "Cargo capacity" into "cargo_capacity\""""
+    return re.sub(r'[^a-z0-9]+', '_', label.lower()).strip('_')
+
+def convert_value(text):
+    """Convert a value to an int or float, or {"value", "unit"} when it carries a unit"""
+    match = NUMBER_RE.match(text)
+    if not match:
+        return text
+    number = match.group(1).replace(",", "")
+    value = float(number) if "." in number else int(number)
+    unit = match.group(2)
+    return {"value": value, "unit": unit.strip()} if unit else value
+
+def _clean(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+def _read_data(elem):
+    """Read one infobox value, returning a list when it is a bulleted list"""
+    items = [_clean(item.text) for item in LIST_ITEMS.select(elem)]
+    items = [item for item in items if item]
+    if len(items) > 1:
+        return [convert_value(item) for item in items]
+    return convert_value(_clean(elem.text))
+
+def extract_infobox(html, backend=None):
+    """Return the fields of the first infobox in a page's HTML, or {} if it has none"""
+    tree = html_parser.parse_html(html, backend, only_classes=INFOBOX_CLASSES)
+    infobox = INFOBOX.select_one(tree)
+    if infobox is None:
+        return {}
+
+    fields = {}
+    title = TITLE.select_one(infobox)
+    if title is not None:
+        fields["name"] = _clean(title.text)
+    subtitle = SUBTITLE.select_one(infobox)
+    if subtitle is not None:
+        fields["subtitle"] = _clean(subtitle.text)
+
+    rows = [(ITEM_LABEL.select_one(item), ITEM_DATA.select_one(item)) for item in ITEMS.select(infobox)]
+    if not rows:
+        rows = [(ROW_LABEL.select_one(row), ROW_DATA.select_one(row)) for row in TABLE_ROWS.select(infobox)]
+
+    for label_elem, data_elem in rows:
+        if label_elem is None or data_elem is None:
+            continue
+        name = field_name(label_elem.text)
+        # The first occurrence wins when several sections repeat a label
+        if name and name not in fields:
+            fields[name] = _read_data(data_elem)
+    return fields
+
+def get_wiki_infobox(page_title):
+    """Get the infobox fields of a wiki page, re-extracting only when the page has a new revision"""
+    print(f"Getting infobox of: {page_title}")
+    try:
+        parse_data = simple_example._get_parsed_page(page_title)
+    except Exception as e:
+        print(f"Error getting wiki page: {e}")
+        return None
+    if parse_data is None:
+        print("Page not found or other error occurred.")
+        return None
+
+    title = parse_data.get("title", page_title)
+    revid = parse_data.get("revid", 0)
+    store = wiki_cache.get_wiki_cache()
+    cached = store.lookup_infobox(title, revid)
+    if cached is not None:
+        return cached
+
+    result = {
+        "title": title,
+        "pageid": parse_data.get("pageid"),
+        "revid": revid,
+        "infobox": extract_infobox(parse_data.get("text", {}).get("*", ""))
+    }
+    store.store_infobox(title, revid, result)
+    return result
+
+def handle_wiki_infobox(params, context):
+    """Handler for wiki/wiki_infobox"""
+    page = params['page']
+    print(f"Using wiki_infobox.py to extract the infobox of: {page}")
+    return get_wiki_infobox(page)
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python wiki_infobox.py <page_title>")
+        return
+    result = get_wiki_infobox(" ".join(sys.argv[1:]))
+    if result is not None:
+        print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()